@@ -1,4 +1,8 @@
 import os
+import threading
+import time
+from typing import Optional
+
 from flask import Flask
 from config import Config
 
@@ -24,6 +28,17 @@ def create_app(config_class: type = Config) -> Flask:
     os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
     os.makedirs(app.config["SESSION_FOLDER"], exist_ok=True)
 
+    # Las sesiones se guardan en subdirectorios (ver
+    # :data:`~app.repositories.session_repo.SESSION_SHARDS`). Al arrancar se
+    # mueven a ellos los archivos de la disposición plana anterior.
+    from app.repositories.session_repo import migrate_flat_sessions
+
+    with app.app_context():
+        max_age = app.config.get("SESSION_EXPIRE_SECONDS", 60 * 60)
+        moved = migrate_flat_sessions(max_age)
+        if moved:
+            app.logger.info("Moved %d session files to the sharded layout", moved)
+
     # Registra el blueprint principal que contiene todas las rutas. El blueprint
     # vive en ``app/routes.py``. Importarlo aquí evita importaciones circulares
     # que ocurrirían si ``routes.py`` importara la app al nivel de módulo.
@@ -31,27 +46,74 @@ def create_app(config_class: type = Config) -> Flask:
 
     app.register_blueprint(main)
 
-    # Elimina automáticamente archivos de sesión expirados en cada solicitud.
-    # Este mecanismo sencillo utiliza la fecha de modificación de los archivos
-    # para decidir si un JSON de sesión debe eliminarse. La edad máxima
-    # se configura mediante ``SESSION_EXPIRE_SECONDS``.
-    from app.repositories.session_repo import remove_expired_sessions
+    # Elimina automáticamente archivos de sesión expirados antes de atender
+    # las solicitudes. Este mecanismo sencillo utiliza la fecha de
+    # modificación de los archivos para decidir si un JSON de sesión debe
+    # eliminarse. La edad máxima se configura mediante
+    # ``SESSION_EXPIRE_SECONDS``. Cada solicitud revisa, por turnos, tantos
+    # subdirectorios de sesiones como corresponda al tiempo transcurrido
+    # desde la anterior revisión, de modo que todos se revisan al menos una
+    # vez cada ``SESSION_SWEEP_SECONDS``: con mucho tráfico el coste se
+    # reparte entre las solicitudes y, tras un periodo sin ellas, la primera
+    # revisa todos antes de leer ninguna sesión. Al completar cada vuelta
+    # también se borran las subidas abandonadas por un proceso interrumpido;
+    # así se recogen mientras el servidor sigue en marcha, no sólo al crear
+    # la aplicación (que con ``preload_app`` ocurre una vez, en el maestro).
+    from app.repositories.session_repo import SESSION_SHARDS, remove_expired_sessions
+    from app.services.schedule_service import remove_stale_uploads
+
+    sweep_lock = threading.Lock()
+    next_shard = 0
+    last_sweep: Optional[float] = None
 
     @app.before_request
     def _cleanup_expired_sessions() -> None:  # type: ignore[override]
-        max_age = app.config.get("SESSION_EXPIRE_SECONDS", 60 * 60)
+        nonlocal next_shard, last_sweep
+        # Si otra solicitud ya está revisando, ésta no espera.
+        if not sweep_lock.acquire(blocking=False):
+            return
         try:
-            remove_expired_sessions(max_age)
+            now = time.monotonic()
+            interval = app.config.get("SESSION_SWEEP_SECONDS", 60)
+            due = len(SESSION_SHARDS)
+            if last_sweep is not None and now - last_sweep < interval:
+                due = int(due * (now - last_sweep) / interval)
+            if not due:
+                return
+            shards = [
+                SESSION_SHARDS[(next_shard + i) % len(SESSION_SHARDS)]
+                for i in range(due)
+            ]
+            full_pass = next_shard + due >= len(SESSION_SHARDS)
+            next_shard = (next_shard + due) % len(SESSION_SHARDS)
+            last_sweep = now
+            max_age = app.config.get("SESSION_EXPIRE_SECONDS", 60 * 60)
+            remove_expired_sessions(max_age, shards)
+            if full_pass:
+                remove_stale_uploads(max_age)
         except Exception as exc:
             # Registra y ignora errores de limpieza para que no interrumpan
             # el procesamiento de la solicitud.
             app.logger.error(f"Error cleaning expired sessions: {exc}")
+        finally:
+            sweep_lock.release()
+
+    # Los ETag de las respuestas incluyen una huella del código y las plantillas
+    # para que un despliegue nuevo invalide las copias en caché.
+    from app.utils.http_utils import app_fingerprint, compress_response
+
+    app.config.setdefault("ETAG_SALT", app_fingerprint(app.root_path))
+
+    # Comprime las respuestas HTML/TSV grandes cuando el cliente lo acepta.
+    app.after_request(compress_response)
 
     # Registra un manejador para solicitudes que exceden el ``MAX_CONTENT_LENGTH``
     # configurado. Cuando un usuario sube un archivo demasiado grande, Flask aborta
     # la solicitud con el código 413. Este manejador renderiza la página index
-    # con un mensaje de error apropiado.
-    from flask import render_template
+    # con un mensaje de error apropiado, o lo devuelve en JSON si la subida se
+    # hizo desde la tabla con ``fetch``.
+    from flask import jsonify, render_template
+    from app.utils.http_utils import wants_json
 
     @app.errorhandler(413)
     def _too_large(error):  # type: ignore[override]
@@ -59,9 +121,25 @@ def create_app(config_class: type = Config) -> Flask:
             "The uploaded file is too large. "
             "Please reduce its size or adjust the MAX_UPLOAD_MB variable."
         )
+        if wants_json():
+            return jsonify({"error": message}), 413
         return render_template("index.html", error=message), 413
 
     return app
 
 
-__all__ = ["create_app"]
+def preload_heavy_modules() -> None:
+    """
+    Importa por adelantado los módulos pesados usados al procesar archivos.
+
+    La aplicación carga pandas y openpyxl de forma diferida, sólo cuando una
+    ruta los necesita. Bajo Gunicorn con ``preload_app`` esta función se llama
+    una vez en el proceso maestro (ver ``gunicorn.conf.py``) para que los
+    workers hereden los módulos ya cargados mediante ``fork`` en lugar de
+    importarlos cada uno por su cuenta.
+    """
+    import pandas  # noqa: F401
+    import openpyxl  # noqa: F401
+
+
+__all__ = ["create_app", "preload_heavy_modules"]
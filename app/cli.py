@@ -0,0 +1,321 @@
+"""
+Procesamiento por lotes de libros de Excel desde la línea de comandos.
+
+Parsea todos los libros de un directorio (o que coincidan con un patrón
+glob) en un pool de procesos, elimina los horarios duplicados y escribe un
+único archivo consolidado ``.xlsx`` o ``.tsv``.
+
+Cada libro terminado se guarda en un directorio de trabajo junto a la
+salida (``<salida>.parts``) y se anota en un manifiesto. Si el proceso se
+interrumpe, al volver a ejecutarlo con la misma salida sólo se parsean los
+libros que faltan o que cambiaron desde entonces.
+
+Uso::
+
+    python -m app.cli archivos/2025-03/ -o marzo.xlsx
+    python -m app.cli "archivos/**/*.xlsx" -o todo.tsv --jobs 8
+"""
+
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.models.schedule_model import Schedule
+from app.services.schedule_service import EXPORT_COLUMNS
+from app.utils.excel_parser import SkippedSheet, parse_excel_file
+from app.utils.layout_profiles import LayoutProfile, load_layout_profiles
+
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def find_workbooks(sources: Sequence[str]) -> List[str]:
+    """
+    Expande directorios y patrones glob en una lista ordenada de libros ``.xlsx``.
+
+    Los directorios se recorren de forma recursiva. Se ignoran los archivos
+    temporales de Excel (``~$...``).
+    """
+    paths = set()
+    for source in sources:
+        if os.path.isdir(source):
+            matches = glob.glob(os.path.join(source, "**", "*.xlsx"), recursive=True)
+        else:
+            matches = glob.glob(source, recursive=True)
+        for path in matches:
+            name = os.path.basename(path)
+            if name.lower().endswith(".xlsx") and not name.startswith("~$"):
+                paths.add(os.path.abspath(path))
+    return sorted(paths)
+
+
+def _file_signature(path: str, profiles_key: str) -> Dict[str, object]:
+    """
+    Devuelve los datos con los que se reconoce un libro ya procesado.
+
+    Incluye el tamaño y la fecha de modificación del archivo y una huella de
+    los perfiles de diseño, para que cambiar los perfiles obligue a parsear
+    de nuevo.
+    """
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "profiles": profiles_key}
+
+
+def _part_name(path: str) -> str:
+    """Nombre del archivo de resultados parciales de un libro."""
+    return hashlib.sha1(path.encode("utf-8")).hexdigest() + ".jsonl"
+
+
+def _load_manifest(work_dir: str) -> Dict[str, Dict[str, object]]:
+    """
+    Lee el manifiesto de libros ya procesados.
+
+    El manifiesto es JSON Lines y sólo se le añaden líneas; si una entrada
+    aparece varias veces, vale la última. Una última línea incompleta (por
+    una interrupción a mitad de escritura) se ignora.
+    """
+    entries: Dict[str, Dict[str, object]] = {}
+    try:
+        with open(os.path.join(work_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                entries[entry["path"]] = entry
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _parse_workbook(
+    path: str, work_dir: str, profiles: Sequence[LayoutProfile]
+) -> Tuple[int, List[SkippedSheet], float]:
+    """
+    Parsea un libro y guarda sus horarios en el directorio de trabajo.
+
+    Se ejecuta en los procesos del pool. Los horarios se escriben primero
+    en un archivo temporal que luego se renombra, para que un libro a medio
+    escribir nunca parezca terminado.
+
+    Returns:
+        Una tupla ``(filas, hojas omitidas, segundos)``.
+    """
+    start = time.perf_counter()
+    skipped: List[SkippedSheet] = []
+    schedules = parse_excel_file(path, skipped, profiles)
+    part_path = os.path.join(work_dir, _part_name(path))
+    tmp_path = part_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(s.to_dict()) + "\n" for s in schedules)
+    os.replace(tmp_path, part_path)
+    return len(schedules), skipped, time.perf_counter() - start
+
+
+def _iter_unique(
+    work_dir: str, paths: Sequence[str], stats: Dict[str, int]
+) -> Iterator[Schedule]:
+    """
+    Recorre los resultados parciales en el orden de ``paths`` sin duplicados.
+
+    Para no guardar cada horario visto, sólo se recuerda un resumen de 16
+    bytes de cada uno. Los duplicados descartados se cuentan en
+    ``stats["duplicates"]``.
+    """
+    seen = set()
+    for path in paths:
+        with open(os.path.join(work_dir, _part_name(path)), "r", encoding="utf-8") as f:
+            for line in f:
+                key = hashlib.blake2b(line.encode("utf-8"), digest_size=16).digest()
+                if key in seen:
+                    stats["duplicates"] += 1
+                    continue
+                seen.add(key)
+                yield Schedule.from_dict(json.loads(line))
+
+
+def write_output(output: str, schedules: Iterator[Schedule]) -> int:
+    """
+    Escribe ``schedules`` en ``output`` sin tenerlos todos en memoria.
+
+    Los ``.xlsx`` se escriben con un libro de openpyxl en modo de sólo
+    escritura; cualquier otra extensión produce un TSV con encabezado.
+
+    Returns:
+        El número de filas escritas.
+    """
+    count = 0
+    tmp_path = output + ".tmp"
+    if output.lower().endswith(".xlsx"):
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Schedule")
+        sheet.append(EXPORT_COLUMNS)
+        for schedule in schedules:
+            sheet.append(schedule.to_row())
+            count += 1
+        workbook.save(tmp_path)
+    else:
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, delimiter="\t", lineterminator="\n")
+            writer.writerow(EXPORT_COLUMNS)
+            for schedule in schedules:
+                writer.writerow(schedule.to_row())
+                count += 1
+    os.replace(tmp_path, output)
+    return count
+
+
+def _log(message: str) -> None:
+    print(message, file=sys.stderr, flush=True)
+
+
+def run(
+    sources: Sequence[str],
+    output: str,
+    jobs: int = 1,
+    profiles_folder: Optional[str] = None,
+    work_dir: Optional[str] = None,
+) -> int:
+    """
+    Procesa los libros de ``sources`` y escribe la salida consolidada.
+
+    Returns:
+        El código de salida del proceso: 0 si todos los libros se
+        procesaron, 1 si alguno falló o no se encontró ninguno.
+    """
+    paths = find_workbooks(sources)
+    if not paths:
+        _log("No .xlsx workbooks found.")
+        return 1
+    work_dir = work_dir or output + ".parts"
+    os.makedirs(work_dir, exist_ok=True)
+    profiles = load_layout_profiles(profiles_folder)
+    profiles_key = hashlib.sha1(repr(profiles).encode("utf-8")).hexdigest()[:12]
+
+    manifest = _load_manifest(work_dir)
+    done = [
+        p
+        for p in paths
+        if manifest.get(p, {}).get("signature") == _file_signature(p, profiles_key)
+        and os.path.exists(os.path.join(work_dir, _part_name(p)))
+    ]
+    done_set = set(done)
+    pending = [p for p in paths if p not in done_set]
+    _log(
+        f"{len(paths)} workbooks: {len(done)} already processed, "
+        f"{len(pending)} to parse with {jobs} process(es)."
+    )
+
+    started = time.perf_counter()
+    parsed_rows = 0
+    failed: List[str] = []
+    if pending:
+        manifest_file = open(
+            os.path.join(work_dir, MANIFEST_NAME), "a", encoding="utf-8"
+        )
+        try:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                futures = [
+                    (p, executor.submit(_parse_workbook, p, work_dir, profiles))
+                    for p in pending
+                ]
+                for index, (path, future) in enumerate(futures, start=1):
+                    name = os.path.relpath(path)
+                    try:
+                        rows, skipped, seconds = future.result()
+                    except Exception as exc:
+                        failed.append(path)
+                        _log(f"[{index}/{len(pending)}] {name}: ERROR {exc}")
+                        continue
+                    entry = {
+                        "path": path,
+                        "signature": _file_signature(path, profiles_key),
+                        "rows": rows,
+                    }
+                    manifest_file.write(json.dumps(entry) + "\n")
+                    manifest_file.flush()
+                    parsed_rows += rows
+                    rate = rows / seconds if seconds else 0.0
+                    _log(
+                        f"[{index}/{len(pending)}] {name}: {rows} rows "
+                        f"in {seconds:.2f}s ({rate:,.0f} rows/s)"
+                    )
+                    for sheet in skipped:
+                        _log(f"    skipped sheet {sheet.sheet_name!r}: {sheet.reason}")
+        finally:
+            manifest_file.close()
+    parse_seconds = time.perf_counter() - started
+
+    failed_set = set(failed)
+    completed = [p for p in paths if p not in failed_set]
+    stats = {"duplicates": 0}
+    write_started = time.perf_counter()
+    written = write_output(output, _iter_unique(work_dir, completed, stats))
+    write_seconds = time.perf_counter() - write_started
+
+    if pending:
+        _log(
+            f"Parsed {parsed_rows:,} rows in {parse_seconds:.2f}s "
+            f"({parsed_rows / parse_seconds if parse_seconds else 0:,.0f} rows/s)."
+        )
+    _log(
+        f"Wrote {written:,} rows to {output} in {write_seconds:.2f}s "
+        f"({written / write_seconds if write_seconds else 0:,.0f} rows/s); "
+        f"{stats['duplicates']:,} duplicates removed."
+    )
+    if failed:
+        _log(f"{len(failed)} workbook(s) failed; run again to retry them.")
+        return 1
+    return 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Punto de entrada de ``python -m app.cli``."""
+    from config import Config
+
+    parser = argparse.ArgumentParser(
+        prog="python -m app.cli",
+        description="Parse a directory of schedule workbooks into one file.",
+    )
+    parser.add_argument(
+        "sources", nargs="+", help="Directories or glob patterns of .xlsx workbooks."
+    )
+    parser.add_argument(
+        "-o", "--output", required=True, help="Output file (.xlsx or .tsv)."
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--profiles",
+        default=Config.LAYOUT_PROFILES_FOLDER,
+        help="Folder with extra layout profiles (default: LAYOUT_PROFILES_FOLDER).",
+    )
+    parser.add_argument(
+        "--work-dir",
+        help="Checkpoint directory (default: <output>.parts).",
+    )
+    args = parser.parse_args(argv)
+    return run(
+        args.sources,
+        args.output,
+        jobs=max(1, args.jobs),
+        profiles_folder=args.profiles or None,
+        work_dir=args.work_dir,
+    )
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
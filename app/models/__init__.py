@@ -1,3 +1,5 @@
 from .schedule_model import Schedule  # noqa: F401
+from .summary_model import ScheduleSummary  # noqa: F401
+from .conflict_model import ConflictIndex  # noqa: F401
 
-__all__ = ["Schedule"]
+__all__ = ["Schedule", "ScheduleSummary", "ConflictIndex"]
@@ -0,0 +1,93 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.utils.conflicts import find_overlaps, parse_clock
+from .schedule_model import Schedule
+
+# Separador de la clave ``código | fecha`` de cada grupo de intervalos.
+_KEY_SEPARATOR = " | "
+
+
+def conflict_key(schedule: Schedule) -> str:
+    """Devuelve la clave (instructor y fecha) bajo la que se comparan los horarios."""
+    return f"{schedule.code}{_KEY_SEPARATOR}{schedule.date}"
+
+
+@dataclass
+class ConflictIndex:
+    """
+    Índice de intervalos por instructor y fecha para detectar clases solapadas.
+
+    Cada horario se guarda como ``[inicio, fin, fila]`` (minutos desde la
+    medianoche y posición en la sesión) bajo la clave :func:`conflict_key`.
+    Al añadir horarios sólo se vuelven a barrer las claves afectadas, con
+    :func:`~app.utils.conflicts.find_overlaps`.
+
+    :attr:`version` es la versión del archivo de sesión a la que corresponde
+    el índice, como en :class:`~app.models.summary_model.ScheduleSummary`.
+    """
+
+    version: Optional[str] = None
+    rows: int = 0
+    intervals: Dict[str, List[List[int]]] = field(default_factory=dict)
+    conflicts: Dict[str, List[List[int]]] = field(default_factory=dict)
+    _dirty: Set[str] = field(default_factory=set, repr=False)
+
+    def add(self, schedules: Iterable[Schedule]) -> None:
+        """
+        Añade ``schedules`` como las filas siguientes de la sesión.
+
+        Los horarios cuya hora no se puede interpretar ocupan su fila pero no
+        se indexan. Si la hora de fin es anterior a la de inicio, se entiende
+        que la clase termina al día siguiente.
+        """
+        for schedule in schedules:
+            row = self.rows
+            self.rows += 1
+            start = parse_clock(schedule.start_time)
+            end = parse_clock(schedule.end_time)
+            if start is None or end is None:
+                continue
+            if end < start:
+                end += 24 * 60
+            key = conflict_key(schedule)
+            self.intervals.setdefault(key, []).append([start, end, row])
+            self._dirty.add(key)
+
+    def resolve(self) -> None:
+        """Recalcula los solapamientos de las claves modificadas desde la última vez."""
+        for key in self._dirty:
+            pairs = find_overlaps(tuple(iv) for iv in self.intervals.get(key, []))
+            if pairs:
+                self.conflicts[key] = sorted([a, b] for a, b in pairs)
+            else:
+                self.conflicts.pop(key, None)
+        self._dirty.clear()
+
+    def conflicted_rows(self) -> Set[int]:
+        """Devuelve las filas que se solapan con al menos otra."""
+        self.resolve()
+        return {row for pairs in self.conflicts.values() for pair in pairs for row in pair}
+
+    def to_dict(self) -> Dict[str, object]:
+        """Convierte el índice en un diccionario serializable en JSON."""
+        self.resolve()
+        return {
+            "version": self.version,
+            "rows": self.rows,
+            "intervals": self.intervals,
+            "conflicts": self.conflicts,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "ConflictIndex":
+        """Crea un :class:`ConflictIndex` a partir de :meth:`to_dict`."""
+        return cls(
+            version=data.get("version"),
+            rows=int(data.get("rows", 0)),
+            intervals=dict(data.get("intervals", {})),
+            conflicts=dict(data.get("conflicts", {})),
+        )
+
+
+__all__ = ["ConflictIndex", "conflict_key"]
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, asdict
-from typing import Dict
+from typing import Dict, List
 
 
 @dataclass
@@ -33,6 +33,26 @@ class Schedule:
         """
         return asdict(self)
 
+    def to_row(self) -> List[object]:
+        """
+        Devuelve los valores del horario como una lista plana.
+
+        El orden es el de las columnas de la tabla y de los archivos
+        exportados (ver ``EXPORT_COLUMNS`` en :mod:`schedule_service`).
+        """
+        return [
+            self.date,
+            self.shift,
+            self.area,
+            self.start_time,
+            self.end_time,
+            self.code,
+            self.instructor,
+            self.group,
+            self.minutes,
+            self.units,
+        ]
+
     @classmethod
     def from_dict(cls, data: Dict[str, object]) -> "Schedule":
         """
@@ -0,0 +1,96 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional
+
+from .schedule_model import Schedule
+
+# Dimensiones por las que se agregan los horarios: nombre de la dimensión y
+# atributos de :class:`Schedule` que forman su clave.
+DIMENSIONS = {
+    "code": ("code",),
+    "area": ("area",),
+    "shift": ("shift",),
+    "date": ("date",),
+    "group": ("group",),
+    "area_shift": ("area", "shift"),
+}
+
+
+def _minutes(schedule: Schedule) -> int:
+    """Devuelve la duración de un horario en minutos, o 0 si no es numérica."""
+    try:
+        return int(schedule.minutes)
+    except (TypeError, ValueError):
+        return 0
+
+
+@dataclass
+class ScheduleSummary:
+    """
+    Totales de una sesión agrupados por instructor, área, turno, fecha y grupo.
+
+    Para cada dimensión de :data:`DIMENSIONS` se guarda, por clave, el número
+    de clases y la suma de minutos. Los totales se actualizan al añadir o
+    quitar horarios, así que leerlos cuesta O(grupos) y no O(filas).
+
+    :attr:`version` es la versión del archivo de sesión a la que corresponden
+    los totales (ver :func:`~app.repositories.session_repo.get_version`).
+    """
+
+    version: Optional[str] = None
+    classes: int = 0
+    minutes: int = 0
+    groups: Dict[str, Dict[str, Dict[str, int]]] = field(
+        default_factory=lambda: {name: {} for name in DIMENSIONS}
+    )
+    # Nombre del instructor de cada código, para mostrarlo en el resumen.
+    instructors: Dict[str, str] = field(default_factory=dict)
+
+    def _apply(self, schedules: Iterable[Schedule], sign: int) -> None:
+        for schedule in schedules:
+            minutes = _minutes(schedule)
+            self.classes += sign
+            self.minutes += sign * minutes
+            for name, attrs in DIMENSIONS.items():
+                key = " | ".join(str(getattr(schedule, a)) for a in attrs)
+                totals = self.groups[name].setdefault(key, {"classes": 0, "minutes": 0})
+                totals["classes"] += sign
+                totals["minutes"] += sign * minutes
+                if totals["classes"] <= 0:
+                    del self.groups[name][key]
+            if sign > 0:
+                self.instructors.setdefault(schedule.code, schedule.instructor)
+            elif schedule.code not in self.groups["code"]:
+                self.instructors.pop(schedule.code, None)
+
+    def add(self, schedules: Iterable[Schedule]) -> None:
+        """Suma ``schedules`` a los totales."""
+        self._apply(schedules, 1)
+
+    def remove(self, schedules: Iterable[Schedule]) -> None:
+        """Resta ``schedules`` de los totales."""
+        self._apply(schedules, -1)
+
+    def to_dict(self) -> Dict[str, object]:
+        """Convierte el resumen en un diccionario serializable en JSON."""
+        return {
+            "version": self.version,
+            "classes": self.classes,
+            "minutes": self.minutes,
+            "groups": self.groups,
+            "instructors": self.instructors,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "ScheduleSummary":
+        """Crea un :class:`ScheduleSummary` a partir de :meth:`to_dict`."""
+        summary = cls(
+            version=data.get("version"),
+            classes=int(data.get("classes", 0)),
+            minutes=int(data.get("minutes", 0)),
+            instructors=dict(data.get("instructors", {})),
+        )
+        summary.groups.update(data.get("groups", {}))
+        return summary
+
+
+__all__ = ["DIMENSIONS", "ScheduleSummary"]
@@ -1,3 +1,23 @@
-from .session_repo import save_data, load_data, update_data, delete_data  # noqa: F401
+from .session_repo import (  # noqa: F401
+    save_data,
+    load_data,
+    update_data,
+    append_data,
+    get_version,
+    load_sidecar,
+    save_sidecar,
+    export_path,
+    delete_data,
+)
 
-__all__ = ["save_data", "load_data", "update_data", "delete_data"]
+__all__ = [
+    "save_data",
+    "load_data",
+    "update_data",
+    "append_data",
+    "get_version",
+    "load_sidecar",
+    "save_sidecar",
+    "export_path",
+    "delete_data",
+]
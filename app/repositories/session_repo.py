@@ -1,23 +1,64 @@
+import glob
+import hashlib
+import itertools
 import json
 import os
 import uuid
-from typing import List, Dict
+from contextlib import contextmanager
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
 
 from flask import current_app
 
+# Los archivos de cada sesión se reparten en subdirectorios según los
+# primeros caracteres hexadecimales de un hash de su id, para que ningún
+# directorio crezca sin límite.
+SHARD_WIDTH = 2
+SESSION_SHARDS = tuple(f"{i:0{SHARD_WIDTH}x}" for i in range(16**SHARD_WIDTH))
+
 
 def _get_session_folder() -> str:
     """Devuelve la ruta absoluta al directorio de datos de sesión."""
     return current_app.config["SESSION_FOLDER"]
 
 
+def _shard(file_id: str) -> str:
+    """Devuelve el subdirectorio (de :data:`SESSION_SHARDS`) de la sesión ``file_id``."""
+    return hashlib.sha1(file_id.encode("utf-8")).hexdigest()[:SHARD_WIDTH]
+
+
+def _session_path(file_id: str, suffix: str = "json", create: bool = False) -> str:
+    """
+    Devuelve la ruta del archivo ``<file_id>.<suffix>`` de una sesión.
+
+    Todos los archivos de una sesión (datos, auxiliares y exportaciones)
+    comparten el subdirectorio :func:`_shard`. Con ``create`` se crea el
+    subdirectorio si no existe.
+    """
+    folder = os.path.join(_get_session_folder(), _shard(file_id))
+    if create:
+        os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"{file_id}.{suffix}")
+
+
+def _write_lines(f, data: Iterable[Dict]) -> None:
+    """Escribe cada elemento de ``data`` como una línea JSON."""
+    f.writelines(json.dumps(item) + "\n" for item in data)
+
+
 def save_data(data: List[Dict]) -> str:
     """
     Crea un nuevo archivo de sesión que contiene ``data`` y devuelve su id.
 
-    Se genera un UUID aleatorio para el nombre del archivo. El contenido JSON
-    se escribe en la carpeta de sesiones configurada. Si la carpeta no existe,
-    se crea.
+    Se genera un UUID aleatorio para el nombre del archivo. El contenido se
+    escribe en el subdirectorio de la sesión dentro de la carpeta de
+    sesiones configurada, como JSON Lines (un objeto por línea), lo que
+    permite añadir filas con :func:`append_data` sin reescribir el archivo.
+    Si el subdirectorio no existe, se crea.
 
     Args:
         data: Una lista de diccionarios que representan horarios.
@@ -26,53 +67,233 @@ def save_data(data: List[Dict]) -> str:
         El identificador de sesión generado.
     """
     file_id = str(uuid.uuid4())
-    session_folder = _get_session_folder()
-    os.makedirs(session_folder, exist_ok=True)
-    file_path = os.path.join(session_folder, f"{file_id}.json")
+    file_path = _session_path(file_id, create=True)
     with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f)
+        _write_lines(f, data)
     return file_id
 
 
-def load_data(file_id: str) -> List[Dict]:
+def load_data(file_id: str, start: int = 0, stop: Optional[int] = None) -> List[Dict]:
     """
     Carga la carga útil JSON asociada a ``file_id``.
 
+    También acepta archivos escritos antes del formato JSON Lines, que
+    contienen una única lista JSON. Con ``start`` o ``stop`` sólo se
+    decodifican las líneas de ese rango; las anteriores se saltan sin
+    interpretarlas.
+
     Args:
         file_id: El identificador de la sesión.
+        start: Posición del primer objeto a devolver.
+        stop: Posición siguiente al último objeto a devolver. Por defecto,
+            hasta el final.
 
     Returns:
-        El objeto deserializado desde JSON guardado en el archivo.
+        La lista de objetos guardados en el archivo.
 
     Raises:
         FileNotFoundError: Si el archivo no existe.
         json.JSONDecodeError: Si el archivo contiene JSON inválido.
     """
-    session_folder = _get_session_folder()
-    file_path = os.path.join(session_folder, f"{file_id}.json")
+    file_path = _session_path(file_id)
     with open(file_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+        if f.read(1) == "[":
+            f.seek(0)
+            return json.load(f)[start:stop]
+        f.seek(0)
+        lines = (line for line in f if line.strip())
+        return [json.loads(line) for line in itertools.islice(lines, start, stop)]
 
 
-def update_data(file_id: str, data: List[Dict]) -> None:
-    """Sobrescribe el contenido del archivo de sesión ``file_id`` con ``data``."""
-    session_folder = _get_session_folder()
-    file_path = os.path.join(session_folder, f"{file_id}.json")
-    with open(file_path, "w", encoding="utf-8") as f:
+@contextmanager
+def _locked(file_path: str) -> Iterator[IO[str]]:
+    """
+    Abre ``file_path`` para añadir y lo bloquea frente a otras escrituras.
+
+    Todas las escrituras de un archivo de sesión (:func:`append_data` y
+    :func:`update_data`) pasan por aquí, de modo que nunca se intercalan,
+    ni entre hilos ni entre procesos web. Como :func:`update_data` sustituye
+    el archivo por otro, tras obtener el bloqueo se comprueba que el archivo
+    abierto siga siendo el de la ruta; si no, se abre el nuevo. En sistemas
+    sin :mod:`fcntl` no se bloquea, pero cada añadido sigue siendo una única
+    escritura al final del archivo.
+
+    Raises:
+        FileNotFoundError: Si el archivo no existe.
+    """
+    while True:
+        # Lectura y escritura sin crear el archivo; con ``O_APPEND`` cada
+        # escritura va al final aunque se haya leído desde el principio.
+        f = open(
+            file_path,
+            "r+",
+            encoding="utf-8",
+            opener=lambda path, flags: os.open(path, flags | os.O_APPEND),
+        )
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            if os.stat(file_path).st_ino == os.fstat(f.fileno()).st_ino:
+                yield f
+                return
+        finally:
+            f.close()
+
+
+def update_data(file_id: str, data: List[Dict]) -> str:
+    """
+    Sobrescribe el contenido del archivo de sesión ``file_id`` con ``data``.
+
+    El contenido se escribe en un archivo temporal que luego reemplaza al
+    original, de modo que el reemplazo es atómico y cambia la versión que
+    devuelve :func:`get_version`. Mientras tanto se bloquea el archivo
+    actual, para que ningún :func:`append_data` añada filas que el
+    reemplazo perdería.
+
+    Returns:
+        La versión del contenido escrito, aunque otra escritura posterior
+        ya haya cambiado la del archivo.
+
+    Raises:
+        FileNotFoundError: Si el archivo de sesión no existe.
+    """
+    file_path = _session_path(file_id)
+    with _locked(file_path):
+        return _replace(file_path, data)
+
+
+def _replace(file_path: str, data: Iterable[Dict]) -> str:
+    """Sustituye ``file_path`` por un archivo nuevo con ``data`` y devuelve su versión."""
+    tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            _write_lines(f, data)
+        # Renombrar conserva el inodo, el tamaño y la fecha de modificación.
+        version = _version(os.stat(tmp_path))
+        os.replace(tmp_path, file_path)
+        return version
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def get_version(file_id: str) -> str:
+    """
+    Devuelve un identificador de la versión actual del archivo de sesión.
+
+    Se obtiene con ``os.stat`` sin leer el archivo: combina el inodo, el
+    tamaño y la fecha de modificación en nanosegundos. Cada
+    :func:`append_data` aumenta el tamaño y cada :func:`update_data` crea
+    un inodo nuevo, así que cualquier escritura produce otra versión.
+
+    Raises:
+        FileNotFoundError: Si el archivo no existe.
+    """
+    return _version(os.stat(_session_path(file_id)))
+
+
+def _version(st: os.stat_result) -> str:
+    """Construye el identificador de versión de :func:`get_version`."""
+    return f"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"
+
+
+def append_data(file_id: str, data: List[Dict]) -> Tuple[str, str]:
+    """
+    Añade ``data`` al final del archivo de sesión ``file_id``.
+
+    Sólo se escriben las filas nuevas; el contenido existente no se lee. Las
+    filas se escriben con una sola escritura y con el archivo bloqueado (ver
+    :func:`_locked`), así que dos solicitudes que añaden a la vez a la misma
+    sesión no se pisan.
+
+    Returns:
+        Una tupla ``(antes, después)`` con las versiones del archivo justo
+        antes y justo después de añadir, tomadas del propio archivo abierto.
+        Si ``antes`` no es la versión que se esperaba, otra escritura se
+        produjo entre medias.
+
+    Raises:
+        FileNotFoundError: Si el archivo de sesión no existe.
+    """
+    file_path = _session_path(file_id)
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(file_path)
+    with _locked(file_path) as f:
+        before = _version(os.fstat(f.fileno()))
+        f.seek(0)
+        if f.read(1) == "[":
+            # Archivo en el formato anterior: se reescribe ya convertido,
+            # con las filas nuevas, igual que en :func:`update_data`.
+            f.seek(0)
+            existing = json.load(f)
+            return before, _replace(file_path, existing + data)
+        f.write("".join(json.dumps(item) + "\n" for item in data))
+        f.flush()
+        return before, _version(os.fstat(f.fileno()))
+
+
+def load_sidecar(file_id: str, kind: str) -> Optional[Dict]:
+    """
+    Carga el archivo auxiliar ``kind`` guardado junto a la sesión ``file_id``.
+
+    Returns:
+        El diccionario guardado con :func:`save_sidecar`, o ``None`` si no
+        existe o no se puede leer.
+    """
+    file_path = _session_path(file_id, f"{kind}.json")
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def save_sidecar(file_id: str, kind: str, data: Dict) -> None:
+    """Guarda ``data`` como archivo auxiliar ``kind`` de la sesión, de forma atómica."""
+    file_path = _session_path(file_id, f"{kind}.json", create=True)
+    tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(data, f)
+    os.replace(tmp_path, file_path)
+
+
+def export_path(file_id: str, name: str) -> str:
+    """
+    Devuelve la ruta de un archivo generado a partir de la sesión ``file_id``.
+
+    El archivo (por ejemplo, un Excel exportado) se guarda como
+    ``<file_id>.<name>`` junto a los de la sesión, así que
+    :func:`delete_data` y :func:`remove_expired_sessions` lo eliminan con
+    ella. ``name`` puede contener comodines de :mod:`glob`.
+    """
+    return _session_path(file_id, name, create=True)
 
 
 def delete_data(file_id: str) -> None:
-    """Elimina el archivo de sesión ``file_id`` si existe."""
-    session_folder = _get_session_folder()
-    file_path = os.path.join(session_folder, f"{file_id}.json")
-    try:
-        os.remove(file_path)
-    except FileNotFoundError:
-        pass
+    """Elimina el archivo de sesión ``file_id`` y todos los que lo acompañan."""
+    # Sólo se recorre el subdirectorio de la sesión, que es pequeño.
+    for path in glob.glob(_session_path(file_id, "*")):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
 
 
-__all__ = ["save_data", "load_data", "update_data", "delete_data"]
+__all__ = [
+    "save_data",
+    "load_data",
+    "update_data",
+    "append_data",
+    "get_version",
+    "load_sidecar",
+    "save_sidecar",
+    "export_path",
+    "delete_data",
+    "SESSION_SHARDS",
+]
 
 #
 # Cleanup utilities
@@ -80,36 +301,77 @@ __all__ = ["save_data", "load_data", "update_data", "delete_data"]
 import time
 
 
-def remove_expired_sessions(max_age_seconds: int) -> None:
+def _remove_if_older(path: str, cutoff: float) -> None:
+    """Elimina ``path`` si su fecha de modificación es anterior a ``cutoff``."""
+    try:
+        if os.path.getmtime(path) < cutoff:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def remove_expired_sessions(
+    max_age_seconds: int, shards: Optional[Iterable[str]] = None
+) -> None:
     """
     Elimina archivos de sesión anteriores a ``max_age_seconds``.
 
-    Esta función escanea el directorio de sesiones y borra cualquier
-    archivo JSON cuya fecha de modificación supere la edad especificada.
+    Esta función escanea los subdirectorios de sesiones indicados y borra
+    cualquier archivo (datos, auxiliares, exportaciones o temporales
+    abandonados) cuya fecha de modificación supere la edad especificada.
 
     Args:
         max_age_seconds: El número de segundos tras los cuales una sesión
             se considera expirada.
+        shards: Subdirectorios de :data:`SESSION_SHARDS` a revisar; por
+            defecto, todos.
     """
     session_folder = _get_session_folder()
-    now = time.time()
-    try:
-        for fname in os.listdir(session_folder):
-            if not fname.endswith(".json"):
-                continue
-            fpath = os.path.join(session_folder, fname)
-            try:
-                mtime = os.path.getmtime(fpath)
-            except FileNotFoundError:
-                continue
-            if now - mtime > max_age_seconds:
-                try:
-                    os.remove(fpath)
-                except FileNotFoundError:
-                    pass
-    except FileNotFoundError:
-        # El directorio no existe; no hay nada que limpiar.
-        pass
+    cutoff = time.time() - max_age_seconds
+    for shard in SESSION_SHARDS if shards is None else shards:
+        try:
+            with os.scandir(os.path.join(session_folder, shard)) as entries:
+                paths = [e.path for e in entries if e.is_file()]
+        except FileNotFoundError:
+            # El subdirectorio no existe; no hay nada que limpiar.
+            continue
+        for path in paths:
+            _remove_if_older(path, cutoff)
+
+
+def migrate_flat_sessions(max_age_seconds: Optional[int] = None) -> int:
+    """
+    Mueve a su subdirectorio los archivos de sesión de la disposición plana anterior.
+
+    Antes, todos los archivos de sesión se guardaban directamente en la
+    carpeta de sesiones. Esta función recorre esa carpeta una vez y mueve
+    cada ``<id>.json`` (y sus auxiliares) al subdirectorio que le
+    corresponde. Los temporales abandonados se eliminan, y también los
+    archivos anteriores a ``max_age_seconds`` si se indica, en lugar de
+    moverlos. Es seguro llamarla varias veces o desde varios procesos.
+
+    Returns:
+        El número de archivos movidos.
+    """
+    session_folder = _get_session_folder()
+    cutoff = time.time() - max_age_seconds if max_age_seconds is not None else None
+    moved = 0
+    with os.scandir(session_folder) as entries:
+        files = [(e.name, e.path) for e in entries if e.is_file()]
+    for name, path in files:
+        if not name.endswith(".json"):
+            _remove_if_older(path, time.time())
+            continue
+        if cutoff is not None:
+            _remove_if_older(path, cutoff)
+        file_id, _, suffix = name.partition(".")
+        try:
+            os.replace(path, _session_path(file_id, suffix, create=True))
+        except FileNotFoundError:
+            # Otro proceso lo movió o eliminó primero.
+            continue
+        moved += 1
+    return moved
 
 
-__all__.append("remove_expired_sessions")
+__all__ += ["remove_expired_sessions", "migrate_flat_sessions"]
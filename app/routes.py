@@ -1,12 +1,15 @@
+import glob
 import os
 import json
-from typing import List
+import uuid
+from typing import List, Optional
 
-import pandas as pd
 from flask import (
     Blueprint,
     abort,
     current_app,
+    jsonify,
+    make_response,
     redirect,
     render_template,
     request,
@@ -18,12 +21,24 @@ from flask import (
 from werkzeug.utils import secure_filename
 
 from app.services.schedule_service import (
-    process_uploaded_files,
+    EXPORT_COLUMNS,
+    append_uploaded_files,
     load_schedules,
-    save_schedules,
+    delete_schedules,
+    get_summary,
+    get_conflicts,
+    session_version,
+    schedule_export_path,
     delete_session_data,
 )
 from app.models.schedule_model import Schedule
+from app.utils.http_utils import (
+    cacheable,
+    is_not_modified,
+    make_etag,
+    not_modified_response,
+    wants_json,
+)
 
 main = Blueprint("main", __name__)
 
@@ -32,7 +47,7 @@ def _serialize_schedules(schedules: List[Schedule]) -> List[List[object]]:
     """
     Convierte una lista de objetos :class:`Schedule` en una lista de listas.
 
-    La plantilla del front-end espera una lista plana de valores para cada
+    La tabla del front-end espera una lista plana de valores para cada
     horario. Esta función centraliza esa lógica de conversión.
 
     Args:
@@ -40,23 +55,46 @@ def _serialize_schedules(schedules: List[Schedule]) -> List[List[object]]:
 
     Returns:
         Una lista de listas, cada lista interna contiene los atributos
-        del horario en el orden esperado por la plantilla.
+        del horario en el orden de las columnas de la tabla.
+    """
+    return [s.to_row() for s in schedules]
+
+
+def _session_etag(data_id: Optional[str], kind: str) -> Optional[str]:
+    """Devuelve el ETag de la representación ``kind`` de la sesión, o ``None``."""
+    if not data_id:
+        return None
+    try:
+        return make_etag(session_version(data_id), kind)
+    except FileNotFoundError:
+        return None
+
+
+def _current_version(data_id: Optional[str]) -> Optional[str]:
+    """Devuelve la versión de la sesión ``data_id``, o ``None`` si no existe."""
+    if not data_id:
+        return None
+    try:
+        return session_version(data_id)
+    except FileNotFoundError:
+        return None
+
+
+def _delta_response(data_id: Optional[str], base: Optional[str], **delta) -> Response:
+    """
+    Devuelve en JSON el cambio que una mutación aplicó a la sesión.
+
+    ``base`` es la versión de la sesión antes del cambio y ``version`` la
+    nueva: el cliente sólo aplica ``delta`` a sus filas si tenía la versión
+    ``base`` y, si no, las vuelve a pedir a ``/rows``. ``conflicts`` es la
+    lista completa de filas solapadas, porque un cambio puede resolver o
+    crear solapamientos en filas que no tocó.
     """
-    return [
-        [
-            s.date,
-            s.shift,
-            s.area,
-            s.start_time,
-            s.end_time,
-            s.code,
-            s.instructor,
-            s.group,
-            s.minutes,
-            s.units,
-        ]
-        for s in schedules
-    ]
+    version = _current_version(data_id)
+    conflicted = get_conflicts(data_id).conflicted_rows() if version else set()
+    return jsonify(
+        dict(delta, base=base, version=version, conflicts=sorted(conflicted))
+    )
 
 
 @main.route("/", methods=["GET", "POST"])
@@ -65,59 +103,122 @@ def index():
     Renderiza la página principal o procesa archivos subidos.
 
     En ``POST``, el usuario ha subido uno o varios archivos Excel.
-    Los archivos se procesan y los horarios extraídos se guardan en
-    la sesión. Al realizar subidas sucesivas en la misma sesión,
+    Los archivos se procesan y los horarios extraídos se añaden por
+    lotes a la sesión. Al realizar subidas sucesivas en la misma sesión,
     los datos se fusionan. Tras el procesamiento, se redirige a
-    ``GET`` el índice para mostrar los resultados.
+    ``GET`` el índice para mostrar los resultados; si la petición acepta
+    JSON, se responde sólo con la posición ``start`` y el número ``count``
+    de las filas añadidas (ver :func:`_delta_response`), que el cliente
+    pide después a ``/rows``. ``start`` es ``None`` si otra subida se
+    intercaló con esta y las filas no quedaron seguidas.
 
-    En ``GET``, se recuperan los horarios existentes de la sesión
-    y se muestran en la plantilla. Si no hay horarios, se muestra
-    una página vacía.
+    En ``GET``, se muestra la página con la tabla vacía si la sesión
+    tiene horarios; el navegador los carga después desde ``/rows``. Si
+    no hay horarios, se muestra una página vacía.
     """
     if request.method == "POST":
         # Recupera los archivos subidos. ``request.files.getlist`` devuelve
         # una lista vacía si no se han seleccionado archivos.
         files = request.files.getlist("files")
         if files:
+            base = _current_version(session.get("data_id"))
             try:
-                new_schedules = process_uploaded_files(files)
-                if new_schedules:
-                    data_id = session.get("data_id")
-                    if data_id:
-                        # Añade a los horarios existentes en lugar de sobrescribir.
-                        existing = load_schedules(data_id)
-                        existing.extend(new_schedules)
-                        save_schedules(existing, data_id=data_id)
-                    else:
-                        data_id = save_schedules(new_schedules)
-                        session["data_id"] = data_id
+                # Añade a los horarios existentes en lugar de sobrescribir. Las
+                # filas se escriben por lotes sin cargar la sesión existente.
+                data_id, start, appended = append_uploaded_files(
+                    files, data_id=session.get("data_id")
+                )
+                if appended:
+                    session["data_id"] = data_id
                     session.modified = True
-                # Siempre redirige tras el procesamiento para evitar reenvíos.
-                return redirect(url_for("main.index"))
             except Exception as e:
                 # Registra el error y muestra la página con mensaje de error.
                 current_app.logger.error(f"Error processing upload: {e}")
+                if wants_json():
+                    return jsonify({"error": str(e)}), 500
                 return render_template("index.html", error=str(e))
+            if wants_json():
+                # Las filas no se incluyen: la respuesta no crece con la subida.
+                return _delta_response(data_id, base, start=start, count=appended)
+            # Siempre redirige tras el procesamiento para evitar reenvíos.
+            return redirect(url_for("main.index"))
+        if wants_json():
+            return jsonify({"error": "No files uploaded"}), 400
         # No se proporcionaron archivos; recarga la página.
         return redirect(url_for("main.index"))
 
-    # GET: recupera los horarios guardados en la sesión.
+    # GET: la página sólo contiene el esqueleto de la tabla; las filas se
+    # piden aparte a ``/rows``. Si el navegador ya tiene la página de esta
+    # versión de la sesión, responde 304 sin consultar nada más.
     data_id = session.get("data_id")
+    etag = _session_etag(data_id, "html")
+    if etag and is_not_modified(etag):
+        return not_modified_response(etag)
+    row_count = 0
     if data_id:
         try:
-            schedules = load_schedules(data_id)
+            row_count = get_summary(data_id).classes
         except FileNotFoundError:
             # Datos de sesión faltantes en disco; limpia la sesión y empieza de nuevo.
             current_app.logger.warning(
                 "Session data file missing; clearing session for data_id=%s", data_id
             )
-            schedules = []
             session.clear()
-    else:
-        schedules = []
-    # Convierte a lista de listas para la plantilla.
-    display_data = _serialize_schedules(schedules)
-    return render_template("index.html", schedules=display_data)
+    response = make_response(render_template("index.html", row_count=row_count))
+    if etag and row_count:
+        cacheable(response, etag)
+    return response
+
+
+@main.route("/rows", methods=["GET"])
+def rows():
+    """
+    Devuelve en JSON las filas de la sesión para la tabla de la vista previa.
+
+    Las filas se envían como arrays de valores en el orden de las columnas
+    de la tabla, no como HTML ya renderizado: el navegador ordena y filtra
+    el array y sólo dibuja las filas visibles. El identificador de cada fila
+    es su posición en la sesión; ``conflicts`` lista las filas que se
+    solapan con otra clase del mismo instructor y fecha.
+
+    Con los parámetros ``start`` y ``stop`` sólo se devuelven las filas de
+    ese rango de posiciones, que empieza en ``start``; ``conflicts`` se
+    limita entonces a ese mismo rango.
+    """
+    data_id = session.get("data_id")
+    if not data_id:
+        abort(404)
+    start = request.args.get("start", 0, type=int)
+    stop = request.args.get("stop", type=int)
+    if start < 0 or (stop is not None and stop < start):
+        abort(400)
+    sliced = start > 0 or stop is not None
+    etag = _session_etag(data_id, f"rows-{start}-{stop}" if sliced else "rows")
+    if etag and is_not_modified(etag):
+        return not_modified_response(etag)
+    try:
+        version = session_version(data_id)
+        schedules = load_schedules(data_id, start, stop)
+        if sliced:
+            end = start + len(schedules)
+            conflicted = {
+                row
+                for row in get_conflicts(data_id).conflicted_rows()
+                if start <= row < end
+            }
+        else:
+            conflicted = get_conflicts(data_id, schedules).conflicted_rows()
+    except FileNotFoundError:
+        abort(404)
+    response = jsonify(
+        {
+            "version": version,
+            "start": start,
+            "rows": _serialize_schedules(schedules),
+            "conflicts": sorted(conflicted),
+        }
+    )
+    return cacheable(response, etag) if etag else response
 
 
 @main.route("/delete-rows", methods=["POST"])
@@ -129,70 +230,114 @@ def delete_rows():
     por comas de índices basados en cero a eliminar. Tras la eliminación,
     los horarios actualizados se guardan y el usuario es redirigido
     de nuevo al índice.
+
+    Si la petición acepta JSON, se responde con las posiciones eliminadas
+    (ver :func:`_delta_response`). Como las posiciones dependen de la
+    versión de la sesión, si el formulario incluye ``version`` y no es la
+    actual no se elimina nada y se responde 409.
     """
     data_id = session.get("data_id")
     if not data_id:
+        if wants_json():
+            return jsonify({"error": "No session data"}), 404
         return redirect(url_for("main.index"))
+    # Parsea los índices separados por comas; filtra cadenas vacías.
+    indices_str = request.form.get("selected_rows", "")
+    indices = [int(i) for i in indices_str.split(",") if i]
+    if wants_json():
+        base = _current_version(data_id)
+        if base is None:
+            session.clear()
+            return jsonify({"error": "No session data"}), 404
+        expected = request.form.get("version")
+        if expected and expected != base:
+            return jsonify({"error": "Session changed", "version": base}), 409
+        try:
+            deleted = delete_schedules(data_id, indices)
+        except FileNotFoundError:
+            session.clear()
+            return jsonify({"error": "No session data"}), 404
+        return _delta_response(data_id, base, deleted=deleted)
     try:
-        schedules = load_schedules(data_id)
+        delete_schedules(data_id, indices)
     except FileNotFoundError:
         # Nada que eliminar.
         session.clear()
-        return redirect(url_for("main.index"))
-    # Parsea los índices separados por comas; filtra cadenas vacías.
-    indices_str = request.form.get("selected_rows", "")
-    indices = [int(i) for i in indices_str.split(",") if i]
-    # Filtra los horarios excluyendo los índices seleccionados.
-    filtered = [s for idx, s in enumerate(schedules) if idx not in indices]
-    save_schedules(filtered, data_id=data_id)
     return redirect(url_for("main.index"))
 
 
-@main.route("/download-processed", methods=["POST"])
+@main.route("/download-processed", methods=["GET", "POST"])
 def download_processed():
     """
     Genera y envía un archivo Excel con los horarios actuales.
 
     Los horarios se cargan de la sesión y se convierten en un DataFrame
     de pandas con nombres de columna legibles. El archivo resultante
-    se guarda en el directorio de subidas y se envía al cliente
+    se guarda junto a los archivos de la sesión y se envía al cliente
     usando la función :func:`send_file` de Flask.
+
+    El archivo generado se conserva mientras la sesión no cambie, así que
+    las descargas repetidas lo envían sin regenerarlo, y un ``GET`` con
+    ``If-None-Match`` vigente recibe 304.
     """
     data_id = session.get("data_id")
     if not data_id:
         session.clear()
         return redirect(url_for("main.index"))
+    etag = _session_etag(data_id, "xlsx")
+    if etag and request.method == "GET" and is_not_modified(etag):
+        return not_modified_response(etag)
+    output_path = schedule_export_path(data_id, etag)
+    if etag and os.path.exists(output_path):
+        return cacheable(_send_schedule_file(output_path), etag)
     try:
         schedules = load_schedules(data_id)
     except FileNotFoundError:
         session.clear()
         return redirect(url_for("main.index"))
+    # pandas se importa aquí para que las rutas que no lo necesitan no
+    # paguen el coste de cargarlo.
+    import pandas as pd
+
     # Construye el DataFrame a partir de los horarios.
     df = pd.DataFrame(
         _serialize_schedules(schedules),
-        columns=[
-            "Date",
-            "Shift",
-            "Area",
-            "Start Time",
-            "End Time",
-            "Code",
-            "Instructor",
-            "Group",
-            "Minutes",
-            "Units",
-        ],
+        columns=EXPORT_COLUMNS,
     )
-    # Guarda en un archivo en el directorio de subidas; reutiliza el mismo nombre
-    # en cada descarga. Los archivos existentes se sobrescriben.
-    output_path = os.path.join(current_app.config["UPLOAD_FOLDER"], "schedule.xlsx")
-    df.to_excel(output_path, index=False)
+    # Guarda en un archivo junto a los de la sesión, con un nombre propio de
+    # esta versión de la sesión. Los archivos de versiones anteriores se borran.
+    for stale in glob.glob(schedule_export_path(data_id, "*")):
+        try:
+            os.remove(stale)
+        except FileNotFoundError:
+            pass
+    # Se escribe con otro nombre y se mueve al final, para que ninguna otra
+    # solicitud envíe un archivo a medio escribir (o abandonado por un
+    # proceso interrumpido) como si fuera el de esta versión.
+    tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            df.to_excel(f, index=False, engine="openpyxl")
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    response = _send_schedule_file(output_path)
+    return cacheable(response, etag) if etag else response
+
+
+def _send_schedule_file(output_path: str):
+    """Envía el Excel generado por :func:`download_processed` como adjunto."""
     try:
         return send_file(
             output_path,
             as_attachment=True,
             mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             download_name="schedule.xlsx",
+            etag=False,
         )
     except Exception as e:
         current_app.logger.error(f"Error sending file: {e}")
@@ -202,28 +347,24 @@ def download_processed():
 @main.route("/destroy-session", methods=["POST"])
 def destroy_session():
     """
-    Elimina todos los datos de sesión y archivos subidos.
+    Elimina todos los datos de la sesión.
 
-    Borra el archivo JSON de la sesión, limpia el directorio de subidas
-    y limpia la sesión de Flask. Luego redirige de vuelta al índice.
+    Borra los archivos de la sesión (incluido el Excel exportado) y limpia
+    la sesión de Flask. Las subidas en curso de otros usuarios no se tocan:
+    cada solicitud borra las suyas. Luego redirige de vuelta al índice, o
+    responde en JSON con la sesión vacía si la petición lo acepta.
     """
     data_id = session.get("data_id")
+    base = _current_version(data_id)
     if data_id:
         try:
             delete_session_data(data_id)
         except Exception as e:
             current_app.logger.error(f"Error deleting session data: {e}")
-    # Limpia el directorio de archivos subidos.
-    upload_folder = current_app.config["UPLOAD_FOLDER"]
-    try:
-        for fname in os.listdir(upload_folder):
-            fpath = os.path.join(upload_folder, fname)
-            if os.path.isfile(fpath):
-                os.remove(fpath)
-    except Exception as e:
-        current_app.logger.error(f"Error cleaning uploads: {e}")
     # Limpia las cookies de sesión.
     session.clear()
+    if wants_json():
+        return _delta_response(None, base, cleared=True)
     return redirect(url_for("main.index"))
 
 
@@ -237,21 +378,85 @@ def schedule():
     se envuelve en una respuesta text/csv para que los navegadores
     lo traten como descargable si es necesario, pero el JS del lado
     del cliente puede leerlo como texto plano y copiarlo al portapapeles.
+
+    Si ``If-None-Match`` coincide con la versión actual de la sesión se
+    responde 304 sin cargar los horarios; el navegador reutiliza su copia.
     """
     data_id = session.get("data_id")
     if not data_id:
         abort(404)
+    etag = _session_etag(data_id, "tsv")
+    if etag and is_not_modified(etag):
+        return not_modified_response(etag)
     try:
         schedules = load_schedules(data_id)
     except FileNotFoundError:
         abort(404)
+    import pandas as pd
+
     df = pd.DataFrame(_serialize_schedules(schedules))
     tsv = df.to_csv(header=False, index=False, sep="\t")
-    return Response(
+    response = Response(
         tsv,
         mimetype="text/csv",
         headers={"Content-Disposition": "attachment;filename=schedule.csv"},
     )
+    return cacheable(response, etag) if etag else response
+
+
+@main.route("/summary", methods=["GET"])
+def summary():
+    """
+    Devuelve en JSON los totales de la sesión actual.
+
+    Incluye el número de clases y la suma de minutos, en total y agrupados
+    por código de instructor, área, turno, fecha, grupo y área/turno. Los
+    totales se mantienen al añadir y eliminar filas, así que esta ruta no
+    carga los horarios de la sesión.
+    """
+    data_id = session.get("data_id")
+    if not data_id:
+        abort(404)
+    etag = _session_etag(data_id, "summary")
+    if etag and is_not_modified(etag):
+        return not_modified_response(etag)
+    try:
+        totals = get_summary(data_id)
+    except FileNotFoundError:
+        abort(404)
+    payload = totals.to_dict()
+    payload.pop("version")
+    response = jsonify(payload)
+    return cacheable(response, etag) if etag else response
+
+
+@main.route("/conflicts", methods=["GET"])
+def conflicts():
+    """
+    Devuelve en JSON las clases solapadas de un mismo instructor y fecha.
+
+    Cada conflicto indica el código del instructor, la fecha y las dos filas
+    (posiciones en la sesión) que se solapan. El índice de intervalos se
+    mantiene junto a la sesión, así que esta ruta no carga los horarios.
+    """
+    data_id = session.get("data_id")
+    if not data_id:
+        abort(404)
+    etag = _session_etag(data_id, "conflicts")
+    if etag and is_not_modified(etag):
+        return not_modified_response(etag)
+    try:
+        index = get_conflicts(data_id)
+    except FileNotFoundError:
+        abort(404)
+    pairs = []
+    for key, rows in sorted(index.conflicts.items()):
+        code, date = key.split(" | ", 1)
+        pairs.extend({"code": code, "date": date, "rows": pair} for pair in rows)
+    response = jsonify(
+        {"conflicts": pairs, "rows": sorted(index.conflicted_rows())}
+    )
+    return cacheable(response, etag) if etag else response
 
 
 __all__ = ["main"]
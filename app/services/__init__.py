@@ -1,13 +1,23 @@
 from .schedule_service import (
-    process_uploaded_files,
-    save_schedules,
+    append_uploaded_files,
+    delete_schedules,
     load_schedules,
+    get_summary,
+    get_conflicts,
+    session_version,
+    schedule_export_path,
     delete_session_data,
+    remove_stale_uploads,
 )
 
 __all__ = [
-    "process_uploaded_files",
-    "save_schedules",
+    "append_uploaded_files",
+    "delete_schedules",
     "load_schedules",
+    "get_summary",
+    "get_conflicts",
+    "session_version",
+    "schedule_export_path",
     "delete_session_data",
+    "remove_stale_uploads",
 ]
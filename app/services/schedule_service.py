@@ -1,100 +1,336 @@
 import os
-from typing import List, Optional
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from flask import current_app
 from werkzeug.utils import secure_filename
 
 from app.models.schedule_model import Schedule
-from app.utils.excel_parser import parse_excel_file
+from app.models.conflict_model import ConflictIndex
+from app.models.summary_model import ScheduleSummary
+from app.utils.bounded_queue import MemoryBudget, MemoryBoundedQueue
+from app.utils.excel_parser import SkippedSheet, iter_excel_file
+from app.utils.layout_profiles import load_layout_profiles
 from app.repositories.session_repo import (
     save_data,
     load_data,
     update_data,
+    append_data,
+    get_version,
+    load_sidecar,
+    save_sidecar,
+    export_path,
     delete_data,
 )
 
 
-def process_uploaded_files(files) -> List[Schedule]:
-    """
-    Procesa una lista de archivos subidos y devuelve los horarios extraídos.
+# Encabezados de las columnas de los archivos exportados, en el orden de
+# :meth:`Schedule.to_row`.
+EXPORT_COLUMNS = [
+    "Date",
+    "Shift",
+    "Area",
+    "Start Time",
+    "End Time",
+    "Code",
+    "Instructor",
+    "Group",
+    "Minutes",
+    "Units",
+]
 
-    Cada archivo se guarda temporalmente en el directorio de subidas
-    configurado, se analiza en una lista de objetos :class:`Schedule`
-    y luego se elimina. Solo se procesan archivos con extensión ``.xlsx``;
-    los demás se ignoran. Las excepciones durante el análisis se propagan
-    al llamador.
+# Tamaño estimado en memoria de un :class:`Schedule` (instancia y sus cadenas),
+# usado para aplicar el límite ``UPLOAD_BUFFER_MB`` de las colas de subida.
+_SCHEDULE_BYTES = 1024
 
-    Args:
-        files: Un iterable de objetos Werkzeug ``FileStorage``.
+# Presupuesto de ``UPLOAD_BUFFER_MB`` compartido por todas las subidas del
+# proceso; se crea en el primer uso porque depende de la configuración.
+_upload_budget: Optional[MemoryBudget] = None
+_upload_budget_lock = threading.Lock()
 
-    Returns:
-        Una lista de todos los horarios extraídos de todos los archivos procesados.
+# Marca que cada productor deja en la cola al terminar su archivo.
+_DONE = object()
+
+# Índices derivados que se guardan junto a cada sesión, por tipo de archivo
+# auxiliar. Todos ofrecen ``add``, ``to_dict``/``from_dict`` y ``version``.
+_DERIVED = {"summary": ScheduleSummary, "conflicts": ConflictIndex}
+
+
+def _get_upload_budget() -> MemoryBudget:
+    """Devuelve el presupuesto de memoria compartido por las subidas."""
+    global _upload_budget
+    with _upload_budget_lock:
+        if _upload_budget is None:
+            max_bytes = current_app.config.get("UPLOAD_BUFFER_MB", 32) * 1024 * 1024
+            _upload_budget = MemoryBudget(max_bytes)
+        return _upload_budget
+
+
+def _save_uploads(files) -> List[str]:
+    """
+    Guarda los ``.xlsx`` subidos y devuelve sus rutas.
+
+    Cada solicitud guarda sus archivos en su propio subdirectorio temporal
+    del directorio de subidas, así que dos subidas simultáneas con el mismo
+    nombre de archivo no se pisan y limpiar una no afecta a las demás.
     """
-    # Recopila las rutas de los archivos válidos. Los archivos se guardan
-    # de forma sincrónica para asegurar que existan antes de comenzar el procesamiento.
+    upload_dir = tempfile.mkdtemp(
+        prefix="upload-", dir=current_app.config["UPLOAD_FOLDER"]
+    )
     file_paths: List[str] = []
-    upload_folder = current_app.config["UPLOAD_FOLDER"]
-    for file in files:
-        filename = file.filename or ""
-        if filename.lower().endswith(".xlsx"):
-            safe_name = secure_filename(filename)
-            file_path = os.path.join(upload_folder, safe_name)
-            file.save(file_path)
-            file_paths.append(file_path)
-    all_schedules: List[Schedule] = []
-    # Analiza los archivos guardados de forma concurrente para mejorar el rendimiento
-    # cuando se procesan múltiples subidas. Usa un thread pool porque
-    # ``parse_excel_file`` realiza E/S y no está limitado por CPU.
-    if file_paths:
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+    try:
+        for file in files:
+            filename = file.filename or ""
+            if filename.lower().endswith(".xlsx"):
+                safe_name = secure_filename(filename)
+                file_path = os.path.join(upload_dir, safe_name)
+                if os.path.exists(file_path):
+                    # Dos archivos con el mismo nombre en la misma subida.
+                    file_path = os.path.join(
+                        upload_dir, f"{len(file_paths)}-{safe_name}"
+                    )
+                file.save(file_path)
+                file_paths.append(file_path)
+    except BaseException:
+        # Si falla un guardado (disco lleno, conexión cortada), no se deja
+        # el directorio de la subida a medias.
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        raise
+    if not file_paths:
+        os.rmdir(upload_dir)
+    return file_paths
 
-        with ThreadPoolExecutor() as executor:
-            futures = {executor.submit(parse_excel_file, p): p for p in file_paths}
-            for future in as_completed(futures):
-                try:
-                    schedules = future.result()
-                    all_schedules.extend(schedules)
-                except Exception as exc:
-                    # Registra las excepciones pero continúa procesando otros archivos
-                    current_app.logger.error(f"Error parsing {futures[future]}: {exc}")
-    # Limpia todos los archivos subidos
+
+def _remove_uploads(file_paths: List[str]) -> None:
+    """Elimina los archivos subidos guardados por :func:`_save_uploads` y su subdirectorio."""
     for path in file_paths:
         try:
             os.remove(path)
         except FileNotFoundError:
             pass
-    return all_schedules
+    for upload_dir in {os.path.dirname(p) for p in file_paths}:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+
+def remove_stale_uploads(max_age_seconds: int) -> None:
+    """
+    Elimina del directorio de subidas lo anterior a ``max_age_seconds``.
+
+    Cada solicitud borra sus propios archivos al terminar; esto sólo recoge
+    los subdirectorios que dejó un proceso interrumpido (por un tiempo de
+    espera agotado o falta de memoria) y los archivos de la disposición
+    anterior, en la que todas las subidas y exportaciones se guardaban
+    directamente en el directorio de subidas. Otros procesos pueden estar
+    borrando sus propias subidas a la vez, así que las entradas que
+    desaparecen se ignoran.
+    """
+    cutoff = time.time() - max_age_seconds
+    with os.scandir(current_app.config["UPLOAD_FOLDER"]) as entries:
+        candidates = list(entries)
+    for entry in candidates:
+        try:
+            if entry.stat().st_mtime >= cutoff:
+                continue
+            if entry.is_dir():
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass
 
 
-def save_schedules(schedules: List[Schedule], data_id: Optional[str] = None) -> str:
+def _log_skipped(skipped: Dict[str, List[SkippedSheet]]) -> None:
     """
-    Persiste una lista de horarios en disco.
+    Informa de las hojas descartadas por no tener el diseño de un horario.
 
-    Los horarios se convierten en una lista de diccionarios antes de
-    la serialización. Cuando se proporciona ``data_id``, el archivo
-    existente con ese identificador se sobrescribirá; de lo contrario,
-    se creará uno nuevo y se devolverá un nuevo identificador.
+    Se registran como advertencias porque el registro de la aplicación omite
+    los mensajes informativos fuera del modo de depuración.
+    """
+    for path, sheets in skipped.items():
+        for sheet in sheets:
+            current_app.logger.warning(
+                "Skipped sheet %r in %s: %s",
+                sheet.sheet_name,
+                os.path.basename(path),
+                sheet.reason,
+            )
+
+
+def append_uploaded_files(
+    files,
+    data_id: Optional[str] = None,
+) -> Tuple[Optional[str], Optional[int], int]:
+    """
+    Procesa archivos subidos y añade sus horarios a una sesión por lotes.
+
+    Cada archivo se analiza en su propio hilo con
+    :func:`~app.utils.excel_parser.iter_excel_file`, que produce los
+    horarios en lotes pequeños. Los lotes pasan por una
+    :class:`~app.utils.bounded_queue.MemoryBoundedQueue` y el hilo de la
+    solicitud los añade al archivo de sesión con :func:`append_data` a
+    medida que llegan. Las colas de todas las subidas del proceso comparten
+    un presupuesto de ``UPLOAD_BUFFER_MB``; si se agota, los hilos de
+    análisis esperan. Así, la memoria necesaria no depende del tamaño de las
+    subidas, ni de cuántas haya a la vez, ni del de la sesión existente.
+
+    Los errores de un archivo se registran y no detienen los demás; los
+    lotes de ese archivo ya añadidos se conservan.
 
     Args:
-        schedules: Una lista de instancias de :class:`Schedule` para guardar.
-        data_id: Identificador opcional para los datos de sesión existentes.
+        files: Un iterable de objetos Werkzeug ``FileStorage``.
+        data_id: Sesión a la que añadir. Si es ``None`` o su archivo ya no
+            existe, se crea una sesión nueva con el primer lote.
 
     Returns:
-        El identificador bajo el cual se guardaron los datos.
+        Una tupla ``(data_id, inicio, filas)``. ``data_id`` es ``None`` si
+        no se extrajo ningún horario y no había sesión. Las filas añadidas
+        ocupan las posiciones desde ``inicio`` en adelante; ``inicio`` es
+        ``None`` si otra escritura se intercaló con las de esta subida y las
+        filas no quedaron seguidas.
     """
-    data = [s.to_dict() for s in schedules]
+    file_paths = _save_uploads(files)
+    if not file_paths:
+        return data_id, None, 0
+    profiles = load_layout_profiles(current_app.config.get("LAYOUT_PROFILES_FOLDER"))
+    workers = current_app.config.get("PARSER_WORKERS", 1)
+    skipped: Dict[str, List[SkippedSheet]] = {p: [] for p in file_paths}
+    buffer: MemoryBoundedQueue = MemoryBoundedQueue(_get_upload_budget())
+
+    def produce(path: str) -> None:
+        # Se ejecuta en un hilo sin contexto de aplicación: los errores se
+        # envían por la cola para que el hilo de la solicitud los registre.
+        try:
+            for batch in iter_excel_file(path, skipped[path], profiles, workers):
+                buffer.put(batch, len(batch) * _SCHEDULE_BYTES)
+        except Exception as exc:
+            buffer.put((path, exc), 0)
+        finally:
+            buffer.put(_DONE, 0)
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Los índices derivados (totales y solapamientos) se actualizan con cada
+    # lote. ``expected`` es la versión del archivo a la que corresponden:
+    # cada escritura propia debe partir de ella. Si otra solicitud escribió
+    # entre medias, los índices ya no describen el archivo y no se guardan,
+    # así que se recalcularán la próxima vez que se lean.
+    derived = {kind: cls() for kind, cls in _DERIVED.items()}
+    expected: Optional[str] = None
     if data_id:
-        update_data(data_id, data)
-        return data_id
-    return save_data(data)
+        try:
+            derived = {kind: _load_derived(data_id, kind) for kind in _DERIVED}
+        except FileNotFoundError:
+            pass
+        versions = {index.version for index in derived.values()}
+        if len(versions) == 1:
+            expected = versions.pop()
+    # Posición de la primera fila añadida: las que ya describen los índices.
+    start = derived["summary"].classes
+    stale = False
+    written = False
+
+    appended = 0
+    try:
+        with ThreadPoolExecutor() as executor:
+            for path in file_paths:
+                executor.submit(produce, path)
+            pending = len(file_paths)
+            try:
+                while pending:
+                    item = buffer.get()
+                    if item is _DONE:
+                        pending -= 1
+                    elif isinstance(item, tuple):
+                        path, exc = item
+                        current_app.logger.error(f"Error parsing {path}: {exc}")
+                    else:
+                        rows = [s.to_dict() for s in item]
+                        before: Optional[str] = None
+                        if data_id:
+                            try:
+                                before, after = append_data(data_id, rows)
+                            except FileNotFoundError:
+                                data_id = None
+                        if not data_id:
+                            # Sesión nueva (o la anterior desapareció): sólo
+                            # contiene este lote y los siguientes.
+                            data_id = save_data(rows)
+                            after = get_version(data_id)
+                            derived = {k: cls() for k, cls in _DERIVED.items()}
+                            expected = None
+                            stale = False
+                            start = appended = 0
+                        if before != expected:
+                            stale = True
+                        for index in derived.values():
+                            index.add(item)
+                        expected = after
+                        written = True
+                        appended += len(rows)
+            except BaseException:
+                # Vacía la cola para que ningún productor quede bloqueado
+                # esperando espacio mientras el pool espera a que termine.
+                while pending:
+                    if buffer.get() is _DONE:
+                        pending -= 1
+                raise
+    finally:
+        _log_skipped(skipped)
+        _remove_uploads(file_paths)
+    if written and not stale:
+        for kind, index in derived.items():
+            _store_derived(data_id, kind, index, expected)
+    return data_id, None if stale else start, appended
+
+
+def delete_schedules(data_id: str, indices: Iterable[int]) -> List[int]:
+    """
+    Elimina de la sesión los horarios en las posiciones ``indices``.
+
+    Los totales de la sesión se actualizan restando sólo los horarios
+    eliminados; el índice de solapamientos se reconstruye porque las
+    posiciones de las filas cambian.
+
+    Args:
+        data_id: Identificador de la sesión almacenada.
+        indices: Posiciones basadas en cero de los horarios a eliminar.
+
+    Returns:
+        Las posiciones eliminadas, en orden. Las que no existían en la
+        sesión se ignoran.
+
+    Raises:
+        FileNotFoundError: Si la sesión no existe.
+    """
+    schedules = load_schedules(data_id)
+    summary = get_summary(data_id, schedules)
+    to_delete = set(indices)
+    kept = [s for idx, s in enumerate(schedules) if idx not in to_delete]
+    removed_ids = [idx for idx in range(len(schedules)) if idx in to_delete]
+    removed = [schedules[idx] for idx in removed_ids]
+    version = update_data(data_id, [s.to_dict() for s in kept])
+    summary.remove(removed)
+    _store_derived(data_id, "summary", summary, version)
+    conflicts = ConflictIndex()
+    conflicts.add(kept)
+    _store_derived(data_id, "conflicts", conflicts, version)
+    return removed_ids
 
 
-def load_schedules(data_id: str) -> List[Schedule]:
+def load_schedules(
+    data_id: str, start: int = 0, stop: Optional[int] = None
+) -> List[Schedule]:
     """
     Carga horarios previamente persistidos.
 
     Args:
         data_id: Identificador de la sesión almacenada.
+        start: Posición del primer horario a cargar.
+        stop: Posición siguiente al último horario a cargar. Por defecto,
+            hasta el final.
 
     Returns:
         Una lista de instancias de :class:`Schedule`.
@@ -103,18 +339,110 @@ def load_schedules(data_id: str) -> List[Schedule]:
         FileNotFoundError: Si el archivo JSON correspondiente a
             ``data_id`` no existe.
     """
-    data = load_data(data_id)
+    data = load_data(data_id, start, stop)
     return [Schedule.from_dict(item) for item in data]
 
 
+def session_version(data_id: str) -> str:
+    """
+    Devuelve la versión del contenido de la sesión sin cargar sus horarios.
+
+    Raises:
+        FileNotFoundError: Si la sesión no existe.
+    """
+    return get_version(data_id)
+
+
+def _store_derived(
+    data_id: str, kind: str, index, version: Optional[str] = None
+) -> None:
+    """Guarda un índice derivado como correspondiente a ``version`` (o a la actual)."""
+    index.version = version or get_version(data_id)
+    save_sidecar(data_id, kind, index.to_dict())
+
+
+def _load_derived(data_id: str, kind: str, schedules: Optional[List[Schedule]] = None):
+    """
+    Carga el índice derivado ``kind`` de la sesión.
+
+    Normalmente sólo se lee el archivo auxiliar guardado. Si falta o
+    corresponde a otra versión de la sesión (por ejemplo, una sesión creada
+    antes de que existiera ese índice), se recalcula a partir de los
+    horarios y se guarda.
+
+    Raises:
+        FileNotFoundError: Si la sesión no existe.
+    """
+    version = get_version(data_id)
+    stored = load_sidecar(data_id, kind)
+    cls = _DERIVED[kind]
+    if stored is not None and stored.get("version") == version:
+        return cls.from_dict(stored)
+    index = cls()
+    index.add(schedules if schedules is not None else load_schedules(data_id))
+    _store_derived(data_id, kind, index, version)
+    return index
+
+
+def get_summary(
+    data_id: str, schedules: Optional[List[Schedule]] = None
+) -> ScheduleSummary:
+    """
+    Devuelve los totales de la sesión, en O(grupos).
+
+    Args:
+        data_id: Identificador de la sesión almacenada.
+        schedules: Horarios de la sesión si el llamador ya los cargó; se
+            usan para evitar leerlos de nuevo si hay que recalcular.
+
+    Raises:
+        FileNotFoundError: Si la sesión no existe.
+    """
+    return _load_derived(data_id, "summary", schedules)
+
+
+def get_conflicts(
+    data_id: str, schedules: Optional[List[Schedule]] = None
+) -> ConflictIndex:
+    """
+    Devuelve el índice de clases solapadas de un mismo instructor y fecha.
+
+    Args:
+        data_id: Identificador de la sesión almacenada.
+        schedules: Horarios de la sesión si el llamador ya los cargó; se
+            usan para evitar leerlos de nuevo si hay que recalcular.
+
+    Raises:
+        FileNotFoundError: Si la sesión no existe.
+    """
+    return _load_derived(data_id, "conflicts", schedules)
+
+
+def schedule_export_path(data_id: str, tag: str) -> str:
+    """
+    Devuelve la ruta del Excel exportado de la sesión para la versión ``tag``.
+
+    Los archivos exportados se guardan junto a los de la sesión, así que se
+    eliminan con ella. ``tag`` puede ser ``"*"`` para buscar con :mod:`glob`
+    los de todas las versiones.
+    """
+    return export_path(data_id, f"{tag}.xlsx")
+
+
 def delete_session_data(data_id: str) -> None:
-    """Elimina el archivo de sesión asociado con ``data_id``."""
+    """Elimina los archivos de la sesión ``data_id``: datos, auxiliares y exportaciones."""
     delete_data(data_id)
 
 
 __all__ = [
-    "process_uploaded_files",
-    "save_schedules",
+    "EXPORT_COLUMNS",
+    "append_uploaded_files",
+    "delete_schedules",
     "load_schedules",
+    "get_summary",
+    "get_conflicts",
+    "session_version",
+    "schedule_export_path",
     "delete_session_data",
+    "remove_stale_uploads",
 ]
@@ -1,9 +1,16 @@
 import * as utils from "./utils.js";
 
+// Filas que se dibujan por encima y por debajo de la ventana visible, para
+// que el desplazamiento no muestre huecos antes del siguiente renderizado.
+const OVERSCAN = 10;
+// Altura por defecto de una fila hasta que se pueda medir la real.
+const DEFAULT_ROW_HEIGHT = 28;
+
 const manager = (function () {
   // --- Variables de estado y elementos del DOM ---
   let table,
     tbody,
+    wrapper,
     headers,
     contextMenu,
     copyRowAction,
@@ -20,55 +27,106 @@ const manager = (function () {
     selectedCountEl,
     itemsCountEl,
     overlapCountEl,
-    deleteForm;
+    deleteForm,
+    uploadForm,
+    loadingOverlay;
 
   let columnsConfig = [];
+  // Todas las filas de la sesión: { id, values, conflict, overlapped }.
+  // ``id`` es la posición de la fila en la sesión del servidor.
   let rowsData = [];
+  let rowsById = new Map();
+  // Filas que pasan los filtros, en el orden actual. Es lo que se dibuja.
+  let view = [];
+  // Ids de las filas seleccionadas; la selección no depende del DOM.
+  let selection = new Set();
   let sortCriteria = [];
-  let rightClickedRow = null;
+  let rightClickedItem = null;
+  // Versión de la sesión a la que corresponden las filas cargadas.
+  let version = null;
+  let rowHeight = DEFAULT_ROW_HEIGHT;
+  let renderQueued = false;
+
+  // Posición de cada columna en los arrays de valores (sin la del checkbox).
+  function columnIndex(label) {
+    return columnsConfig.find((c) => c.label === label)?.dataIndex ?? -1;
+  }
+
+  function value(item, label) {
+    return item.values[columnIndex(label)] ?? "";
+  }
 
   function sortData() {
     if (sortCriteria.length === 0) return;
+    // Se calcula la clave de orden de cada fila una sola vez, no en cada
+    // comparación.
+    const criteria = sortCriteria
+      .map((sc) => ({
+        cfg: columnsConfig.find((c) => c.label === sc.label),
+        sign: sc.direction === "asc" ? 1 : -1,
+      }))
+      .filter((c) => c.cfg);
+    const keys = new Map(
+      rowsData.map((item) => [
+        item,
+        criteria.map((c) => c.cfg.parser(String(item.values[c.cfg.dataIndex]))),
+      ])
+    );
     rowsData.sort((a, b) => {
-      for (const criterion of sortCriteria) {
-        const cfg = columnsConfig.find((c) => c.label === criterion.label);
-        if (!cfg) continue;
-        const va = cfg.parser(a.data[criterion.label]);
-        const vb = cfg.parser(b.data[criterion.label]);
-        let comparison = va < vb ? -1 : va > vb ? 1 : 0;
-        if (comparison !== 0) {
-          return criterion.direction === "asc" ? comparison : -comparison;
-        }
+      const ka = keys.get(a);
+      const kb = keys.get(b);
+      for (let i = 0; i < criteria.length; i++) {
+        const comparison = ka[i] < kb[i] ? -1 : ka[i] > kb[i] ? 1 : 0;
+        if (comparison !== 0) return comparison * criteria[i].sign;
       }
       return 0;
     });
   }
 
-  function render() {
-    const frag = document.createDocumentFragment();
-    let visibleCount = 0;
-    rowsData.forEach((item) => {
-      item.row.style.display = item.visible ? "" : "none";
-      item.row.classList.toggle("overlap-row", item.overlapped);
-      frag.appendChild(item.row);
-      if (item.visible) visibleCount++;
+  function buildRow(item) {
+    const tr = document.createElement("tr");
+    const selected = selection.has(item.id);
+    tr.dataset.id = item.id;
+    tr.classList.toggle("selected-row", selected);
+    tr.classList.toggle("overlap-row", item.overlapped);
+
+    const checkTd = document.createElement("td");
+    const cb = document.createElement("input");
+    cb.type = "checkbox";
+    cb.name = "selected_rows";
+    cb.value = item.id;
+    cb.checked = selected;
+    checkTd.appendChild(cb);
+    tr.appendChild(checkTd);
+
+    item.values.forEach((val) => {
+      const td = document.createElement("td");
+      const span = document.createElement("span");
+      span.textContent = val;
+      td.appendChild(span);
+      tr.appendChild(td);
     });
+    return tr;
+  }
 
-    tbody.innerHTML = "";
-    tbody.appendChild(frag);
-
-    if (itemsCountEl) {
-      itemsCountEl.textContent = visibleCount;
-    }
+  function spacerRow(height) {
+    const tr = document.createElement("tr");
+    tr.className = "spacer-row";
+    const td = document.createElement("td");
+    td.colSpan = headers.length;
+    td.style.height = `${height}px`;
+    tr.appendChild(td);
+    return tr;
+  }
 
-    const selCount = rowsData.filter((it) => it.selected).length;
-    selectedCountEl.textContent = selCount;
-    overlapCountEl.textContent = rowsData.filter(
-      (it) => it.visible && it.overlapped
-    ).length;
+  // Dibuja sólo las filas de ``view`` que caen en la ventana visible del
+  // contenedor; el resto se sustituye por dos filas espaciadoras con la
+  // altura que ocuparían, para conservar la barra de desplazamiento.
+  function renderWindow() {
+    renderQueued = false;
+    const frag = document.createDocumentFragment();
 
-    const existingNoData = document.getElementById("noDataRow");
-    if (visibleCount === 0 && !existingNoData) {
+    if (view.length === 0) {
       const tr = document.createElement("tr");
       tr.id = "noDataRow";
       const td = document.createElement("td");
@@ -76,14 +134,47 @@ const manager = (function () {
       td.textContent = "Not found data";
       td.style.textAlign = "center";
       tr.appendChild(td);
-      tbody.appendChild(tr);
-    } else if (visibleCount > 0 && existingNoData) {
-      existingNoData.remove();
+      frag.appendChild(tr);
+    } else {
+      const scrollTop = wrapper.scrollTop;
+      const height = wrapper.clientHeight || rowHeight * 20;
+      const start = Math.max(0, Math.floor(scrollTop / rowHeight) - OVERSCAN);
+      const end = Math.min(
+        view.length,
+        Math.ceil((scrollTop + height) / rowHeight) + OVERSCAN
+      );
+      if (start > 0) frag.appendChild(spacerRow(start * rowHeight));
+      for (let i = start; i < end; i++) frag.appendChild(buildRow(view[i]));
+      if (end < view.length)
+        frag.appendChild(spacerRow((view.length - end) * rowHeight));
+    }
+
+    tbody.replaceChildren(frag);
+
+    // Mide la altura real de una fila la primera vez que hay alguna dibujada.
+    const sample = tbody.querySelector("tr[data-id]");
+    if (sample && sample.offsetHeight && sample.offsetHeight !== rowHeight) {
+      rowHeight = sample.offsetHeight;
+      scheduleRender();
     }
   }
 
+  function scheduleRender() {
+    if (renderQueued) return;
+    renderQueued = true;
+    requestAnimationFrame(renderWindow);
+  }
+
+  function render() {
+    if (itemsCountEl) {
+      itemsCountEl.textContent = view.length;
+    }
+    overlapCountEl.textContent = view.filter((it) => it.overlapped).length;
+    renderWindow();
+  }
+
   function updateSelectedCount() {
-    const totalSelectedCount = rowsData.filter((it) => it.selected).length;
+    const totalSelectedCount = selection.size;
 
     // Actualiza el texto del contador
     selectedCountEl.textContent = totalSelectedCount;
@@ -92,15 +183,11 @@ const manager = (function () {
     deleteForm.style.display = totalSelectedCount > 0 ? "inline-block" : "none";
 
     // --- Lógica del checkbox "Select All" ---
-    const visibleItems = rowsData.filter((it) => it.visible);
-    const selectedVisibleCount = visibleItems.filter(
-      (it) => it.selected
+    const selectedVisibleCount = view.filter((it) =>
+      selection.has(it.id)
     ).length;
 
-    if (
-      visibleItems.length > 0 &&
-      selectedVisibleCount === visibleItems.length
-    ) {
+    if (view.length > 0 && selectedVisibleCount === view.length) {
       selectAllCheckbox.checked = true;
       selectAllCheckbox.indeterminate = false;
     } else if (selectedVisibleCount > 0) {
@@ -126,53 +213,19 @@ const manager = (function () {
     });
   }
 
-  function onFilterChange() {
-    // Obtiene los strings de los filtros y los procesa.
-    const instructorFilters = filterInstructor.value
-      .toLowerCase()
-      .split(",")
-      .map((s) => s.trim())
-      .filter(Boolean); // Filtra strings vacíos
-
-    const groupFilters = filterGroup.value
-      .toLowerCase()
-      .split(",")
-      .map((s) => s.trim())
-      .filter(Boolean);
-
-    const onlyOverlap = filterOverlaps.checked;
-
-    // Resetea el estado de solapamiento en cada cambio
-    rowsData.forEach((item) => (item.overlapped = false));
+  // Marca las filas solapadas. Los solapamientos del MISMO instructor y
+  // fecha los calcula el servidor (``conflicts`` de ``/rows``); aquí sólo
+  // se buscan grupos con el mismo horario y DIFERENTES instructores.
+  function markOverlaps() {
+    rowsData.forEach((item) => (item.overlapped = item.conflict));
 
-    // Detectar solapamientos para el MISMO instructor
-    const byInstructor = {};
-    rowsData.forEach((it) => {
-      const key = it.data["Instructor"] || "__NO_INSTRUCTOR__";
-      (byInstructor[key] = byInstructor[key] || []).push(it);
-    });
-    Object.values(byInstructor).forEach((list) => {
-      for (let i = 0; i < list.length; i++) {
-        for (let j = i + 1; j < list.length; j++) {
-          const a = list[i],
-            b = list[j];
-          if (
-            utils.parseTimeToMinutes(a.data["Start Time"]) <
-              utils.parseTimeToMinutes(b.data["End Time"]) &&
-            utils.parseTimeToMinutes(b.data["Start Time"]) <
-              utils.parseTimeToMinutes(a.data["End Time"])
-          ) {
-            a.overlapped = b.overlapped = true;
-          }
-        }
-      }
-    });
-
-    // Detectar solapamientos por grupo y horario entre DIFERENTES instructores
     const byGroupAndTime = {};
     rowsData.forEach((it) => {
       // Se crea una clave única combinando el grupo y el horario.
-      const key = `${it.data["Group"]}_${it.data["Start Time"]}_${it.data["End Time"]}`;
+      const key = `${value(it, "Group")}_${value(it, "Start Time")}_${value(
+        it,
+        "End Time"
+      )}`;
       (byGroupAndTime[key] = byGroupAndTime[key] || []).push(it);
     });
 
@@ -181,7 +234,7 @@ const manager = (function () {
       if (list.length > 1) {
         // Usamos un Set para encontrar instructores únicos de forma eficiente.
         const instructorsInSlot = new Set(
-          list.map((item) => item.data["Instructor"])
+          list.map((item) => value(item, "Instructor"))
         );
         // Si hay más de un instructor único, es un conflicto.
         if (instructorsInSlot.size > 1) {
@@ -190,11 +243,30 @@ const manager = (function () {
         }
       }
     });
+  }
 
-    // Aplica los filtros
-    rowsData.forEach((item) => {
-      const instructorData = item.data["Instructor"]?.toLowerCase() || "";
-      const groupData = item.data["Group"]?.toLowerCase() || "";
+  function applyFilters() {
+    // Obtiene los strings de los filtros y los procesa.
+    const instructorFilters = filterInstructor.value
+      .toLowerCase()
+      .split(",")
+      .map((s) => s.trim())
+      .filter(Boolean); // Filtra strings vacíos
+
+    const groupFilters = filterGroup.value
+      .toLowerCase()
+      .split(",")
+      .map((s) => s.trim())
+      .filter(Boolean);
+
+    const onlyOverlap = filterOverlaps.checked;
+    const instructorIdx = columnIndex("Instructor");
+    const groupIdx = columnIndex("Group");
+
+    // Aplica los filtros sobre el array de datos
+    view = rowsData.filter((item) => {
+      const instructorData = String(item.values[instructorIdx]).toLowerCase();
+      const groupData = String(item.values[groupIdx]).toLowerCase();
 
       const passInst =
         instructorFilters.length === 0 ||
@@ -205,19 +277,32 @@ const manager = (function () {
         groupFilters.some((filter) => groupData.includes(filter));
 
       const passOverlap = !onlyOverlap || item.overlapped;
-      item.visible = passInst && passGrp && passOverlap;
+      return passInst && passGrp && passOverlap;
     });
+  }
 
-    // Renderiza la tabla actualizada
+  // Vuelve a filtrar y dibujar sin mover el desplazamiento (tras un cambio
+  // en los datos).
+  function refresh() {
+    applyFilters();
     render();
     updateSelectedCount();
   }
 
+  function onFilterChange() {
+    // Renderiza la tabla actualizada desde el principio
+    wrapper.scrollTop = 0;
+    refresh();
+  }
+
   function toggleRowSelection(item, isSelected) {
-    item.selected = isSelected;
-    const cb = item.row.querySelector('input[name="selected_rows"]');
-    if (cb) cb.checked = isSelected;
-    item.row.classList.toggle("selected-row", isSelected);
+    if (isSelected) selection.add(item.id);
+    else selection.delete(item.id);
+  }
+
+  function itemFromRow(tr) {
+    if (!tr || tr.dataset.id === undefined) return null;
+    return rowsById.get(Number(tr.dataset.id)) || null;
   }
 
   // --- Lógica de los manejadores de eventos (Event Handlers) ---
@@ -242,19 +327,19 @@ const manager = (function () {
     }
     sortData();
     updateSortHeaders();
-    render();
+    onFilterChange();
   }
 
   function handleRowClick(e) {
     const tr = e.target.closest("tr");
-    if (!tr) return;
-    const item = rowsData.find((it) => it.row === tr);
+    const item = itemFromRow(tr);
     if (!item) return;
     const cb = tr.querySelector('input[name="selected_rows"]');
     if (e.target !== cb) {
       cb.checked = !cb.checked;
     }
     toggleRowSelection(item, cb.checked);
+    tr.classList.toggle("selected-row", cb.checked);
     updateSelectedCount();
   }
 
@@ -275,37 +360,57 @@ const manager = (function () {
     });
 
     selectAllCheckbox.addEventListener("change", (e) => {
-      rowsData.forEach((item) => {
-        if (item.visible) toggleRowSelection(item, e.target.checked);
-      });
+      view.forEach((item) => toggleRowSelection(item, e.target.checked));
+      renderWindow();
       updateSelectedCount();
     });
 
+    wrapper.addEventListener("scroll", scheduleRender, { passive: true });
+    window.addEventListener("resize", scheduleRender);
+
     tbody.addEventListener("click", handleRowClick);
     tbody.addEventListener("mouseover", (e) =>
-      e.target.closest("tr")?.classList.add("hover-row")
+      e.target.closest("tr[data-id]")?.classList.add("hover-row")
     );
     tbody.addEventListener("mouseout", (e) =>
-      e.target.closest("tr")?.classList.remove("hover-row")
+      e.target.closest("tr[data-id]")?.classList.remove("hover-row")
     );
 
     deleteBtn.addEventListener("click", () => {
-      const indices = rowsData
-        .filter((it) => it.selected)
-        .map((it) => it.originalIndex);
-      if (indices.length) {
-        document.getElementById("selectedRowsDeleteInput").value =
-          indices.join(",");
-        deleteForm.submit();
-      }
+      const ids = Array.from(selection).sort((a, b) => a - b);
+      if (!ids.length) return;
+      const body = new FormData();
+      body.append("selected_rows", ids.join(","));
+      if (version) body.append("version", version);
+      mutate(deleteForm.action, body)
+        .then(
+          (delta) => delta && applyDelta(delta, () => removeRows(delta.deleted))
+        )
+        .catch((err) => console.error(err));
+    });
+
+    uploadForm?.addEventListener("submit", (e) => {
+      e.preventDefault();
+      mutate(uploadForm.action, new FormData(uploadForm))
+        .then((delta) => {
+          uploadForm.reset();
+          if (delta) return appendUploaded(delta);
+        })
+        .catch((err) => {
+          console.error(err);
+          alert(err.message);
+        });
     });
 
     downloadBtn?.addEventListener("click", () =>
       document.getElementById("downloadForm").submit()
     );
-    cleanBtn?.addEventListener("click", () =>
-      document.getElementById("cleanForm").submit()
-    );
+    cleanBtn?.addEventListener("click", () => {
+      const cleanForm = document.getElementById("cleanForm");
+      mutate(cleanForm.action, new FormData(cleanForm))
+        .then((delta) => delta && applyDelta(delta, () => removeRows(null)))
+        .catch((err) => console.error(err));
+    });
     scheduleBtn.addEventListener("click", () => {
       fetch("/schedule", { method: "GET" })
         .then((res) => {
@@ -321,7 +426,9 @@ const manager = (function () {
     instructorsBtn.addEventListener("click", () => {
       // Usamos un Set para obtener instructores únicos directamente de los datos
       const instructorSet = new Set(
-        rowsData.map((item) => item.data["Instructor"]?.trim()).filter(Boolean) // Filtra nombres vacíos o nulos
+        rowsData
+          .map((item) => String(value(item, "Instructor")).trim())
+          .filter(Boolean) // Filtra nombres vacíos o nulos
       );
 
       const uniqueInstructors = Array.from(instructorSet);
@@ -338,9 +445,9 @@ const manager = (function () {
 
     tbody.addEventListener("contextmenu", (e) => {
       e.preventDefault();
-      const tr = e.target.closest("tr");
-      if (!tr || tr.id === "noDataRow") return;
-      rightClickedRow = tr;
+      const item = itemFromRow(e.target.closest("tr"));
+      if (!item) return;
+      rightClickedItem = item;
       contextMenu.style.top = `${e.pageY}px`;
       contextMenu.style.left = `${e.pageX}px`;
       contextMenu.style.display = "block";
@@ -352,15 +459,14 @@ const manager = (function () {
     });
 
     copyRowAction.addEventListener("click", () => {
-      if (!rightClickedRow) return;
-      const cells = rightClickedRow.cells;
-      const date = cells[1].textContent.trim();
-      const groupName = cells[8].textContent.trim();
+      if (!rightClickedItem) return;
+      const date = String(value(rightClickedItem, "Date")).trim();
+      const groupName = String(value(rightClickedItem, "Group")).trim();
       const startTime24h = utils.convertTo24HourFormat(
-        cells[4].textContent.trim()
+        String(value(rightClickedItem, "Start Time"))
       );
       const endTime24h = utils.convertTo24HourFormat(
-        cells[5].textContent.trim()
+        String(value(rightClickedItem, "End Time"))
       );
       const formattedText = `${date}\n${groupName}\n${startTime24h} - ${endTime24h}`;
       navigator.clipboard
@@ -377,12 +483,133 @@ const manager = (function () {
     });
   }
 
+  // --- Cambios en los datos sin recargar la página ---
+
+  // Envía una mutación y devuelve su respuesta JSON, o ``null`` si la sesión
+  // había cambiado (409) y las filas se recargaron en su lugar.
+  function mutate(url, body) {
+    loadingOverlay?.classList.remove("hidden");
+    return fetch(url, {
+      method: "POST",
+      body,
+      headers: { Accept: "application/json" },
+    })
+      .then((res) => {
+        if (res.status === 409) return reload().then(() => null);
+        // Los errores no previstos (un 500, un proxy) pueden llegar en HTML.
+        const isJson = (res.headers.get("Content-Type") || "").includes(
+          "application/json"
+        );
+        if (!isJson)
+          throw new Error(
+            res.ok ? "Unexpected response" : `Request failed (${res.status})`
+          );
+        return res.json().then((data) => {
+          if (!res.ok) throw new Error(data.error || "Request failed");
+          return data;
+        });
+      })
+      .finally(() => loadingOverlay?.classList.add("hidden"));
+  }
+
+  // Aplica a las filas cargadas el cambio devuelto por el servidor. Si las
+  // filas no correspondían a la versión sobre la que se aplicó, se recargan.
+  function applyDelta(delta, patch) {
+    if (delta.base !== version) return reload();
+    patch();
+    version = delta.version;
+    const conflicts = new Set(delta.conflicts || []);
+    rowsData.forEach((item) => (item.conflict = conflicts.has(item.id)));
+    rowsById = new Map(rowsData.map((item) => [item.id, item]));
+    markOverlaps();
+    refresh();
+  }
+
+  // Quita las filas ``ids`` (ordenados) o todas si es ``null``. Las filas
+  // posteriores a cada eliminada bajan una posición, como en el servidor.
+  function removeRows(ids) {
+    selection = new Set();
+    if (ids === null) {
+      rowsData = [];
+      return;
+    }
+    const removed = new Set(ids);
+    rowsData = rowsData.filter((item) => !removed.has(item.id));
+    rowsData.forEach((item) => {
+      // Número de ids eliminados menores que el de la fila (búsqueda binaria).
+      let lo = 0,
+        hi = ids.length;
+      while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (ids[mid] < item.id) lo = mid + 1;
+        else hi = mid;
+      }
+      item.id -= lo;
+    });
+  }
+
+  // Pide a ``/rows`` sólo las filas que añadió una subida y las añade. Si no
+  // quedaron seguidas o la sesión cambió después de la subida, se recargan
+  // todas.
+  function appendUploaded(delta) {
+    if (delta.base !== version || delta.start === null) return reload();
+    const stop = delta.start + delta.count;
+    return fetchRows(`${tbody.dataset.src}?start=${delta.start}&stop=${stop}`)
+      .then((slice) => {
+        if (slice.version !== delta.version) return reload();
+        applyDelta(delta, () => appendRows(slice.start, slice.rows));
+      });
+  }
+
+  // Añade las filas subidas, que ocupan las posiciones desde ``start``.
+  function appendRows(start, rows) {
+    rows.forEach((values, i) =>
+      rowsData.push({
+        id: start + i,
+        values,
+        conflict: false,
+        overlapped: false,
+      })
+    );
+    sortData();
+  }
+
+  function fetchRows(url) {
+    return fetch(url, { method: "GET" }).then((res) => {
+      if (!res.ok) throw new Error("Error loading data");
+      return res.json();
+    });
+  }
+
+  function reload() {
+    return fetchRows(tbody.dataset.src).then(load);
+  }
+
+  // Sustituye los datos de la tabla por las filas de ``payload`` (la
+  // respuesta de ``/rows``).
+  function load(payload) {
+    version = payload.version;
+    const conflicts = new Set(payload.conflicts || []);
+    rowsData = payload.rows.map((values, id) => ({
+      id,
+      values,
+      conflict: conflicts.has(id),
+      overlapped: false,
+    }));
+    rowsById = new Map(rowsData.map((item) => [item.id, item]));
+    selection = new Set();
+    markOverlaps();
+    sortData();
+    onFilterChange();
+  }
+
   // Se expone un único método `init` que pone todo en marcha.
   function init(tableSelector) {
     // Asignar elementos del DOM
     table = document.querySelector(tableSelector);
     if (!table) return;
     tbody = table.tBodies[0];
+    wrapper = table.parentElement;
     headers = Array.from(table.tHead.querySelectorAll("th"));
     contextMenu = document.getElementById("row-context-menu");
     copyRowAction = document.getElementById("copy-row-action");
@@ -400,40 +627,29 @@ const manager = (function () {
     itemsCountEl = document.getElementById("items-count");
     overlapCountEl = document.getElementById("overlap-items");
     deleteForm = document.getElementById("deleteForm");
+    uploadForm = document.getElementById("uploadForm");
+    loadingOverlay = document.getElementById("loading-overlay");
 
-    // Construir configuración y datos iniciales
+    // Construir configuración de columnas
     headers.forEach((th) => {
       th.dataset.originalText = th.textContent.trim();
     });
     columnsConfig = headers.map((th, idx) => ({
       label: th.dataset.originalText,
       index: idx,
+      // La primera columna es la del checkbox y no tiene datos.
+      dataIndex: idx - 1,
       parser: /time/i.test(th.dataset.originalText)
         ? utils.parseTimeToMinutes
         : utils.textParser,
       sortable: idx > 0,
       headerEl: th,
     }));
-    rowsData = Array.from(tbody.rows).map((row, i) => {
-      const data = {};
-      columnsConfig.forEach((cfg) => {
-        data[cfg.label] = row.cells[cfg.index]?.textContent.trim() || "";
-      });
-      const cb = row.querySelector('input[name="selected_rows"]');
-      row.dataset.originalIndex = i;
-      return {
-        row,
-        data,
-        visible: true,
-        overlapped: false,
-        selected: !!cb?.checked,
-        originalIndex: i,
-      };
-    });
 
-    // Enlazar todos los eventos y hacer el renderizado inicial
+    // Enlazar todos los eventos y cargar las filas
     bindEvents();
-    onFilterChange();
+    updateSelectedCount();
+    reload().catch((err) => console.error(err));
   }
 
   return {
@@ -6,6 +6,7 @@ from .text_utils import (
     determine_shift_by_time,
 )
 from .excel_parser import parse_excel_file
+from .layout_profiles import LayoutProfile, load_layout_profiles
 
 __all__ = [
     "extract_parenthesized_schedule",
@@ -14,4 +15,6 @@ __all__ = [
     "format_time_periods",
     "determine_shift_by_time",
     "parse_excel_file",
+    "LayoutProfile",
+    "load_layout_profiles",
 ]
@@ -0,0 +1,82 @@
+import threading
+from collections import deque
+from typing import Deque, Generic, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class MemoryBudget:
+    """
+    Presupuesto de memoria compartido entre hilos, medido en bytes estimados.
+
+    Funciona como un semáforo cuyo contador son bytes: :meth:`acquire`
+    bloquea mientras la reserva no quepa en ``max_bytes`` y :meth:`release`
+    devuelve lo reservado. Un mismo presupuesto puede repartirse entre
+    varias :class:`MemoryBoundedQueue`, de modo que el límite vale para
+    todas juntas y no para cada una.
+
+    Una reserva mayor que el límite completo sólo se concede cuando el
+    presupuesto está sin usar; de lo contrario nunca podría concederse.
+    Quien reserva debe usar lotes bastante menores que el límite para que
+    esto no ocurra en la práctica.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._used = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, size: int) -> None:
+        """Reserva ``size`` bytes, esperando hasta que haya espacio."""
+        with self._cond:
+            while self._used and self._used + size > self.max_bytes:
+                self._cond.wait()
+            self._used += size
+
+    def release(self, size: int) -> None:
+        """Devuelve ``size`` bytes reservados con :meth:`acquire`."""
+        with self._cond:
+            self._used -= size
+            self._cond.notify_all()
+
+    @property
+    def used_bytes(self) -> int:
+        """Bytes reservados en este momento."""
+        with self._cond:
+            return self._used
+
+
+class MemoryBoundedQueue(Generic[T]):
+    """
+    Cola entre hilos limitada por el tamaño estimado de su contenido.
+
+    A diferencia de :class:`queue.Queue`, el límite no es un número de
+    elementos sino una suma de tamaños que indica quien produce cada
+    elemento, descontada de un :class:`MemoryBudget`. Cuando el presupuesto
+    se agota, :meth:`put` bloquea al productor hasta que algún consumidor
+    libere espacio con :meth:`get`.
+    """
+
+    def __init__(self, budget: MemoryBudget) -> None:
+        self.budget = budget
+        self._items: Deque[Tuple[T, int]] = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item: T, size: int) -> None:
+        """Añade ``item``, esperando mientras no haya espacio para ``size`` bytes."""
+        self.budget.acquire(size)
+        with self._cond:
+            self._items.append((item, size))
+            self._cond.notify()
+
+    def get(self) -> T:
+        """Extrae el elemento más antiguo, esperando si la cola está vacía."""
+        with self._cond:
+            while not self._items:
+                self._cond.wait()
+            item, size = self._items.popleft()
+        self.budget.release(size)
+        return item
+
+
+__all__ = ["MemoryBudget", "MemoryBoundedQueue"]
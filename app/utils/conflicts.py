@@ -0,0 +1,67 @@
+import heapq
+import re
+from typing import Hashable, Iterable, List, Optional, Tuple
+
+_CLOCK_RE = re.compile(r"(\d{1,2}):(\d{2})(?::\d{2})?\s*([AP]M)?", re.IGNORECASE)
+
+
+def parse_clock(text: str) -> Optional[int]:
+    """
+    Convierte una hora normalizada en minutos desde la medianoche.
+
+    Acepta el formato que produce :func:`format_time_periods` (``"7:30 AM"``,
+    ``"12:00 PM"``) y horas de 24 horas (``"13:30"``, ``"07:00:00"``). Si la
+    cadena contiene varias horas, se usa la primera.
+
+    Returns:
+        Los minutos desde la medianoche, o ``None`` si no se reconoce una hora.
+    """
+    match = _CLOCK_RE.search(str(text))
+    if not match:
+        return None
+    hours, minutes = int(match.group(1)), int(match.group(2))
+    meridiem = (match.group(3) or "").upper()
+    if meridiem == "PM" and hours < 12:
+        hours += 12
+    elif meridiem == "AM" and hours == 12:
+        hours = 0
+    if hours > 23 or minutes > 59:
+        return None
+    return hours * 60 + minutes
+
+
+def find_overlaps(
+    intervals: Iterable[Tuple[int, int, Hashable]],
+) -> List[Tuple[Hashable, Hashable]]:
+    """
+    Encuentra todos los pares de intervalos que se solapan.
+
+    Los intervalos se ordenan por inicio y se recorren una vez manteniendo en
+    un heap los que siguen abiertos, ordenados por fin. Al llegar un
+    intervalo se descartan los que terminaron antes de su inicio; todos los
+    que quedan se solapan con él. El coste es O(n log n + k), siendo k el
+    número de pares encontrados, en lugar de comparar todos los pares.
+
+    Dos intervalos que sólo se tocan (uno termina cuando empieza el otro) no
+    se consideran solapados.
+
+    Args:
+        intervals: Tuplas ``(inicio, fin, id)``.
+
+    Returns:
+        Pares ``(id_a, id_b)``, donde ``a`` empieza no después que ``b``.
+    """
+    pairs: List[Tuple[Hashable, Hashable]] = []
+    active: List[Tuple[int, int, Hashable]] = []
+    for order, (start, end, item) in enumerate(
+        sorted(intervals, key=lambda iv: (iv[0], iv[1]))
+    ):
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        pairs.extend((other, item) for _, _, other in active)
+        # ``order`` desempata en el heap para no comparar los ids.
+        heapq.heappush(active, (end, order, item))
+    return pairs
+
+
+__all__ = ["parse_clock", "find_overlaps"]
@@ -1,9 +1,15 @@
-import os
-from typing import List
-
-import pandas as pd
+import multiprocessing
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from multiprocessing.managers import SyncManager
+from typing import Iterator, List, Optional, Sequence, Tuple
 
 from app.models.schedule_model import Schedule
+from .layout_profiles import LayoutProfile, load_layout_profiles
 from .text_utils import (
     extract_parenthesized_schedule,
     extract_keyword_from_text,
@@ -13,106 +19,490 @@ from .text_utils import (
     determine_shift_by_time,
 )
 
+# Filas de encabezado ya leídas de una hoja: una tupla de valores por fila.
+HeaderRows = List[Tuple[object, ...]]
+
+# Un libro sólo se reparte entre procesos si cada uno recibe al menos estas
+# hojas; con menos, abrir el libro en cada proceso cuesta más de lo que ahorra.
+MIN_SHEETS_PER_WORKER = 4
+
+# Tamaño máximo de cada lote producido por :func:`iter_excel_file`, para que
+# quien limite la memoria por lotes no reciba nunca una hoja entera de golpe.
+MAX_BATCH_ROWS = 1000
+
+# Segundos entre comprobaciones de que el proceso que envía los lotes de un
+# rango sigue vivo mientras se esperan.
+_POLL_SECONDS = 1.0
+
+_pool: Optional[ProcessPoolExecutor] = None
+# Proceso auxiliar que crea las colas por las que el pool envía los lotes.
+_manager: Optional[SyncManager] = None
+_pool_lock = threading.Lock()
+
+
+@dataclass
+class SkippedSheet:
+    """Una hoja descartada por no ajustarse al diseño esperado."""
+
+    sheet_name: str
+    reason: str
+
+
+def _has_value(value: object) -> bool:
+    """Indica si el valor de una celda tiene contenido."""
+    return value is not None and str(value).strip() != ""
+
+
+def _cell_value(header: HeaderRows, cell: Tuple[int, int]) -> object:
+    """Devuelve el valor de ``cell`` en las filas de encabezado, o ``None``."""
+    row, col = cell
+    if row >= len(header) or col >= len(header[row]):
+        return None
+    return header[row][col]
+
 
-def parse_excel_file(file_path: str) -> List[Schedule]:
+def _cell_name(cell: Tuple[int, int]) -> str:
+    """Devuelve la referencia de Excel (p. ej. ``"O2"``) de una coordenada."""
+    from openpyxl.utils import get_column_letter
+
+    row, col = cell
+    return f"{get_column_letter(col + 1)}{row + 1}"
+
+
+def _ignore_declared_dimensions(worksheet) -> None:
     """
-    Parsea un libro de Excel y extrae una lista de horarios.
+    Descarta las dimensiones que declara el archivo de una hoja de sólo lectura.
+
+    Muchos programas escriben un ``<dimension>`` incorrecto (por ejemplo,
+    ``A1``) y openpyxl lo usa para recortar las filas y columnas que lee.
+    Igual que pandas, se descartan para leer las celdas que hay realmente.
+    """
+    reset = getattr(worksheet, "reset_dimensions", None)
+    if reset is not None:
+        reset()
 
-    El parser recorre todas las hojas del libro. Se extraen metadatos de celdas específicas
-    (ver comentarios en el código) y cada fila a partir de la fila 7 se inspecciona para
-    encontrar entradas válidas. Se consideran válidas aquellas filas que contienen ciertos
-    campos obligatorios (hora de inicio, hora de fin, grupo y nombre del programa). Las
-    duraciones y los nombres de área se infieren usando funciones auxiliares en :mod:`time_utils`.
+
+def detect_sheet_layout(
+    worksheet, profile: LayoutProfile, header: HeaderRows
+) -> Optional[str]:
+    """
+    Comprueba de forma económica si una hoja tiene el diseño de ``profile``.
+
+    Sólo se revisan las primeras filas ya leídas: las hojas demasiado
+    pequeñas (resúmenes, tablas dinámicas) o sin las celdas de encabezado
+    del perfil se rechazan sin leer el resto.
 
     Args:
-        file_path: Ruta absoluta al archivo de libro de Excel (.xlsx).
+        worksheet: Hoja de openpyxl en modo de sólo lectura.
+        profile: Perfil de diseño a comprobar.
+        header: Primeras filas de la hoja, al menos ``profile.min_rows`` si
+            la hoja las tiene.
 
     Returns:
-        Una lista de instancias de :class:`Schedule` extraídas del archivo.
+        ``None`` si la hoja se ajusta al perfil; en caso contrario, una
+        cadena que explica por qué no.
+    """
+    if len(header) < profile.min_rows:
+        return f"only {len(header)} rows (expected at least {profile.min_rows})"
+    for key in profile.required_cells:
+        cell = profile.cells[key]
+        if not _has_value(_cell_value(header, cell)):
+            return f"no {key} in {_cell_name(cell)}"
+    for cell, pattern in profile.match:
+        if not pattern.search(str(_cell_value(header, cell) or "")):
+            return f"{_cell_name(cell)} does not match {pattern.pattern!r}"
+    return None
+
+
+def select_layout(
+    worksheet, profiles: Sequence[LayoutProfile]
+) -> Tuple[Optional[LayoutProfile], HeaderRows, str]:
+    """
+    Elige el primer perfil de ``profiles`` que se ajusta a la hoja.
+
+    Sólo se leen las primeras filas que necesita el perfil más exigente.
+    Las dimensiones declaradas en el archivo se ignoran (ver
+    :func:`_ignore_declared_dimensions`).
+
+    Returns:
+        Una tupla ``(perfil, encabezado, motivo)``. Si ningún perfil se
+        ajusta, ``perfil`` es ``None`` y ``motivo`` resume por qué se
+        descartó cada uno.
+    """
+    if not hasattr(worksheet, "iter_rows"):
+        return None, [], "not a worksheet"
+    _ignore_declared_dimensions(worksheet)
+    header_rows = max(max(p.header_rows, p.min_rows) for p in profiles)
+    header = list(worksheet.iter_rows(max_row=header_rows, values_only=True))
+    reasons = []
+    for profile in profiles:
+        reason = detect_sheet_layout(worksheet, profile, header)
+        if reason is None:
+            return profile, header, ""
+        reasons.append(f"{profile.name}: {reason}")
+    return None, header, "; ".join(reasons)
+
+
+def parse_sheet(
+    worksheet, profile: LayoutProfile, header: HeaderRows
+) -> List[Schedule]:
+    """
+    Extrae los horarios de una hoja con el diseño de ``profile``.
+
+    La hoja se recorre una sola vez a partir de la primera fila de datos y de
+    cada fila se toman únicamente las columnas del plan del perfil.
+
+    Args:
+        worksheet: Hoja de openpyxl en modo de sólo lectura.
+        profile: Perfil que :func:`select_layout` eligió para la hoja.
+        header: Filas de encabezado devueltas por :func:`select_layout`.
+
+    Returns:
+        Los horarios de la hoja, en el orden de sus filas.
     """
+    schedule_date = _cell_value(header, profile.cells["date"])
+    location = _cell_value(header, profile.cells["location"])
+    area_name = extract_keyword_from_text(location) or ""
+    instructor_name = _cell_value(header, profile.cells["instructor"])
+    instructor_code = _cell_value(header, profile.cells["code"])
+    try:
+        date_str = schedule_date.strftime("%d/%m/%Y")
+    except Exception:
+        date_str = str(schedule_date)
+
+    _ignore_declared_dimensions(worksheet)
+    rows = [
+        profile.extract(row)
+        for row in worksheet.iter_rows(
+            min_row=profile.first_data_row + 1, values_only=True
+        )
+    ]
+    # Cuenta cuántas veces aparece cada grupo en las filas de datos.
+    group_counts = Counter(group for _, _, group, _, _ in rows if group is not None)
+
     schedules: List[Schedule] = []
-    with pd.ExcelFile(file_path) as xls:
-        for sheet_name in xls.sheet_names:
-            df = pd.read_excel(xls, sheet_name)
-            if df.empty:
-                continue
-            # Extrae metadatos a nivel de hoja. La fecha está almacenada en la fila 0,
-            # columna 14; la ubicación en la fila 0, columna 21; el nombre del instructor
-            # en la fila 4, columna 0; y el código del instructor en la fila 3, columna 0.
-            try:
-                schedule_date = df.iat[0, 14]
-                location = df.iat[0, 21]
-                area_name = extract_keyword_from_text(location) or ""
-                instructor_name = df.iat[4, 0]
-                instructor_code = df.iat[3, 0]
-            except Exception:
-                # Omite las hojas que no se ajustan al diseño esperado.
+    for start_time, end_time, group_name, raw_block, program_name in rows:
+        # Omite filas con datos faltantes.
+        if not (_has_value(start_time) and _has_value(end_time)):
+            continue
+
+        if not _has_value(group_name):
+            # Procesar bloque sólo si pasa el filtro
+            block_filtered = (
+                filter_special_tags(str(raw_block)) if raw_block is not None else None
+            )
+            if block_filtered and str(block_filtered).strip():
+                group_name = block_filtered
+            else:
+                continue  # ni grupo ni bloque válidos → saltar fila
+
+        duration = extract_duration_or_keyword(str(program_name)) or ""
+        start_text = extract_parenthesized_schedule(str(start_time))
+        shift = determine_shift_by_time(start_text)
+        # Construye el nombre del área; añade "KIDS" para las clases infantiles.
+        program_keyword = extract_keyword_from_text(str(program_name))
+        area_value = (
+            f"{area_name}/{program_keyword}"
+            if program_keyword == "KIDS" and area_name
+            else area_name
+        )
+        schedules.append(
+            Schedule(
+                date=date_str,
+                shift=shift,
+                area=area_value,
+                start_time=format_time_periods(start_text),
+                end_time=format_time_periods(
+                    extract_parenthesized_schedule(str(end_time))
+                ),
+                code="" if instructor_code is None else str(instructor_code),
+                instructor=str(instructor_name),
+                group=str(group_name),
+                minutes=str(duration),
+                units=group_counts.get(group_name, 0),
+            )
+        )
+    return schedules
+
+
+def _parse_sheets(
+    workbook,
+    sheet_names: Sequence[str],
+    profiles: Sequence[LayoutProfile],
+) -> Tuple[List[Schedule], List[SkippedSheet]]:
+    """Parsea ``sheet_names`` de un libro ya abierto, en orden."""
+    schedules: List[Schedule] = []
+    skipped: List[SkippedSheet] = []
+    for sheet_name in sheet_names:
+        worksheet = workbook[sheet_name]
+        profile, header, reason = select_layout(worksheet, profiles)
+        if profile is None:
+            skipped.append(SkippedSheet(sheet_name, reason))
+            continue
+        schedules.extend(parse_sheet(worksheet, profile, header))
+    return schedules, skipped
+
+
+def _parse_sheet_range(
+    file_path: str,
+    sheet_names: Sequence[str],
+    profiles: Sequence[LayoutProfile],
+    batches,
+    stop,
+) -> None:
+    """
+    Abre el libro una vez y parsea un rango de hojas. Se ejecuta en el pool.
+
+    Los resultados se envían por la cola ``batches`` a medida que se parsea
+    cada hoja, como pares ``(horarios, hojas omitidas)`` con lotes de como
+    mucho :data:`MAX_BATCH_ROWS`, y al final un ``None``. La cola tiene un
+    hueco, así que el proceso espera a que se consuma cada lote antes de
+    seguir. Si se activa el evento ``stop``, deja de parsear.
+    """
+    from openpyxl import load_workbook
+
+    try:
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for sheet_name in sheet_names:
+                if stop.is_set():
+                    return
+                schedules, skipped = _parse_sheets(workbook, [sheet_name], profiles)
+                if skipped:
+                    batches.put(([], skipped))
+                for batch in _batches(schedules):
+                    batches.put((batch, []))
+        finally:
+            workbook.close()
+    finally:
+        batches.put(None)
+
+
+def _receive(
+    future: Future, batches
+) -> Iterator[Tuple[List[Schedule], List[SkippedSheet]]]:
+    """
+    Produce lo que envía :func:`_parse_sheet_range` por ``batches``.
+
+    Termina al recibir el ``None`` final y propaga el error del proceso, si
+    lo hubo. Si el proceso muere sin enviarlo, ``future`` termina con
+    :class:`BrokenProcessPool`, que también se propaga.
+    """
+    while True:
+        try:
+            message = batches.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            if not future.done() or not batches.empty():
                 continue
-            # Itera sobre las filas comenzando en el índice 6 (fila 7 en Excel).
-            for _, row in df.iloc[6:].iterrows():
-                start_time = row.iloc[0]
-                end_time = row.iloc[3]
-                group_name = row.iloc[17] if len(row) > 17 else None
-                raw_block = row.iloc[19] if len(row) > 19 else None
-
-                # Procesar bloque sólo si pasa el filtro
-                if pd.notna(raw_block):
-                    block_filtered = filter_special_tags(str(raw_block))
-                else:
-                    block_filtered = None
-
-                program_name = row.iloc[25] if len(row) > 25 else None
-                # Omite filas con datos faltantes.
-                if not all(
-                    pd.notnull(value) and str(value).strip() != ""
-                    for value in (start_time, end_time)
-                ):
-                    continue
-
-                if not (pd.notna(group_name) and str(group_name).strip()):
-                    if block_filtered and str(block_filtered).strip():
-                        group_name = block_filtered
-                    else:
-                        continue  # ni grupo ni bloque válidos → saltar fila
-
-                duration = extract_duration_or_keyword(str(program_name)) or ""
-                # Cuenta cuántas veces aparece este grupo en el resto de la hoja.
-                try:
-                    unit_count = int((df.iloc[6:][df.columns[17]] == group_name).sum())
-                except Exception:
-                    unit_count = 0
-                shift = determine_shift_by_time(
-                    extract_parenthesized_schedule(str(start_time))
-                )
-                # Construye el nombre del área; añade "KIDS" para las clases infantiles.
-                program_keyword = extract_keyword_from_text(str(program_name))
-                area_value = (
-                    f"{area_name}/{program_keyword}"
-                    if program_keyword == "KIDS" and area_name
-                    else area_name
-                )
-                try:
-                    date_str = schedule_date.strftime("%d/%m/%Y")
-                except Exception:
-                    date_str = str(schedule_date)
-                schedule = Schedule(
-                    date=date_str,
-                    shift=shift,
-                    area=area_value,
-                    start_time=format_time_periods(
-                        extract_parenthesized_schedule(str(start_time))
-                    ),
-                    end_time=format_time_periods(
-                        extract_parenthesized_schedule(str(end_time))
-                    ),
-                    code=str(instructor_code),
-                    instructor=str(instructor_name),
-                    group=str(group_name),
-                    minutes=str(duration),
-                    units=unit_count,
+            future.result()
+            return
+        if message is None:
+            future.result()
+            return
+        yield message
+
+
+def _abandon(running: List[Tuple[Future, object]], stop) -> None:
+    """
+    Detiene los rangos que ya no se van a consumir.
+
+    Se usa cuando el consumidor abandona :func:`iter_excel_file` o hubo un
+    error: los rangos que aún no empezaron se cancelan y los demás se
+    detienen y se vacían sus colas, para que ningún proceso del pool quede
+    esperando a enviar un lote. Sus errores ya no interesan a nadie.
+    """
+    try:
+        stop.set()
+    except Exception:
+        # El gestor de colas ya se cerró junto con un pool roto.
+        return
+    for future, batches in running:
+        if future.cancel():
+            continue
+        try:
+            for _ in _receive(future, batches):
+                pass
+        except Exception:
+            pass
+
+
+def _get_pool(workers: int) -> Tuple[ProcessPoolExecutor, SyncManager]:
+    """
+    Devuelve el pool de procesos compartido y su gestor de colas, creándolos
+    en el primer uso.
+
+    Los procesos se crean con ``forkserver`` (o ``spawn``) en lugar de
+    ``fork``, porque el servidor web atiende solicitudes en varios hilos y
+    hacer ``fork`` de un proceso con hilos puede heredar locks tomados.
+    """
+    global _pool, _manager
+    with _pool_lock:
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context(
+                "forkserver" if "forkserver" in methods else "spawn"
+            )
+            if context.get_start_method() == "forkserver":
+                context.set_forkserver_preload([__name__])
+            _manager = context.Manager()
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _pool, _manager
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    Descarta ``pool`` si sigue siendo el pool compartido.
+
+    Si un proceso del pool muere (por falta de memoria, por ejemplo), el
+    pool queda inservible para siempre; se cierra junto con su gestor de
+    colas para que :func:`_get_pool` cree otros en el siguiente uso.
+    """
+    global _pool, _manager
+    manager = None
+    with _pool_lock:
+        if _pool is pool:
+            manager = _manager
+            _pool = _manager = None
+    pool.shutdown(wait=False, cancel_futures=True)
+    if manager is not None:
+        manager.shutdown()
+
+
+def _split(items: Sequence[str], parts: int) -> List[Sequence[str]]:
+    """Divide ``items`` en ``parts`` rangos contiguos de tamaño similar."""
+    size, extra = divmod(len(items), parts)
+    ranges, start = [], 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(items[start:end])
+        start = end
+    return ranges
+
+
+def _batches(schedules: List[Schedule]) -> Iterator[List[Schedule]]:
+    """Divide ``schedules`` en lotes de como mucho :data:`MAX_BATCH_ROWS`."""
+    for start in range(0, len(schedules), MAX_BATCH_ROWS):
+        yield schedules[start : start + MAX_BATCH_ROWS]
+
+
+def iter_excel_file(
+    file_path: str,
+    skipped: Optional[List[SkippedSheet]] = None,
+    profiles: Optional[Sequence[LayoutProfile]] = None,
+    workers: int = 1,
+) -> Iterator[List[Schedule]]:
+    """
+    Parsea un libro de Excel y produce sus horarios por lotes.
+
+    El parser recorre todas las hojas del libro. Para cada una se elige un
+    perfil de diseño (ver :mod:`layout_profiles`) comprobando sus dimensiones
+    y celdas de encabezado; las hojas que no se ajustan a ningún perfil se
+    omiten sin leerlas enteras. De las demás se extraen los metadatos de las
+    celdas del perfil y se inspecciona cada fila de datos. Se consideran
+    válidas aquellas filas que tienen hora de inicio, hora de fin y un grupo
+    (o bloque). Las duraciones y los nombres de área se infieren usando
+    funciones auxiliares en :mod:`text_utils`.
+
+    Cada lote contiene como mucho :data:`MAX_BATCH_ROWS` horarios de una
+    hoja, de modo que quien consume el generador no necesita tener el libro
+    entero en memoria. Con ``workers`` mayor que 1 y suficientes hojas, las
+    hojas se reparten en un rango contiguo por proceso de un pool
+    compartido, de al menos :data:`MIN_SHEETS_PER_WORKER` hojas; cada
+    proceso abre el libro una sola vez y envía los lotes de su rango a
+    medida que parsea cada hoja, esperando a que se consuman (ver
+    :func:`_parse_sheet_range`). Los lotes siempre se producen en el orden
+    de las hojas.
+
+    Args:
+        file_path: Ruta absoluta al archivo de libro de Excel (.xlsx).
+        skipped: Lista opcional en la que se añade un :class:`SkippedSheet`
+            por cada hoja omitida.
+        profiles: Perfiles a probar en orden. Por defecto, los incluidos en
+            la aplicación.
+        workers: Número máximo de procesos entre los que repartir las hojas.
+
+    Yields:
+        Listas no vacías de instancias de :class:`Schedule`.
+    """
+    # openpyxl se importa de forma diferida para que arrancar la aplicación
+    # no pague su coste.
+    from openpyxl import load_workbook
+
+    if profiles is None:
+        profiles = load_layout_profiles()
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet_names = workbook.sheetnames
+        parts = min(workers, len(sheet_names) // MIN_SHEETS_PER_WORKER)
+        if parts <= 1:
+            for sheet_name in sheet_names:
+                schedules, skipped_sheets = _parse_sheets(
+                    workbook, [sheet_name], profiles
                 )
-                schedules.append(schedule)
+                if skipped is not None:
+                    skipped.extend(skipped_sheets)
+                yield from _batches(schedules)
+            return
+    finally:
+        workbook.close()
+
+    pool, manager = _get_pool(workers)
+    stop = manager.Event()
+    running: List[Tuple[Future, object]] = []
+    try:
+        for sheet_range in _split(sheet_names, parts):
+            batches = manager.Queue(maxsize=1)
+            future = pool.submit(
+                _parse_sheet_range,
+                file_path,
+                sheet_range,
+                tuple(profiles),
+                batches,
+                stop,
+            )
+            running.append((future, batches))
+        while running:
+            future, batches = running[0]
+            for batch, skipped_sheets in _receive(future, batches):
+                if skipped is not None:
+                    skipped.extend(skipped_sheets)
+                if batch:
+                    yield batch
+            running.pop(0)
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
+    finally:
+        if running:
+            _abandon(running, stop)
+
+
+def parse_excel_file(
+    file_path: str,
+    skipped: Optional[List[SkippedSheet]] = None,
+    profiles: Optional[Sequence[LayoutProfile]] = None,
+    workers: int = 1,
+) -> List[Schedule]:
+    """
+    Parsea un libro de Excel y extrae una lista de horarios.
+
+    Igual que :func:`iter_excel_file`, pero devuelve todos los horarios del
+    libro en una sola lista.
+
+    Returns:
+        Una lista de instancias de :class:`Schedule` extraídas del archivo.
+    """
+    schedules: List[Schedule] = []
+    for batch in iter_excel_file(file_path, skipped, profiles, workers):
+        schedules.extend(batch)
     return schedules
 
 
-__all__ = ["parse_excel_file"]
+__all__ = [
+    "SkippedSheet",
+    "detect_sheet_layout",
+    "select_layout",
+    "parse_sheet",
+    "iter_excel_file",
+    "parse_excel_file",
+]
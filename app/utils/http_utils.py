@@ -0,0 +1,140 @@
+import gzip
+import hashlib
+import os
+from typing import Optional
+
+from flask import Response, current_app, request
+
+# Tipos de contenido que vale la pena comprimir.
+COMPRESSIBLE_MIMETYPES = {"text/html", "text/csv", "application/json"}
+
+# Sufijo que se añade al ETag de cada codificación, para que cada
+# representación comprimida tenga su propio ETag fuerte.
+_ENCODING_SUFFIX = {"br": "br", "gzip": "gz"}
+
+
+def app_fingerprint(root_path: str) -> str:
+    """
+    Calcula una huella de las plantillas y el código de la aplicación.
+
+    Se usa como parte de los ETag para que un despliegue que cambie cómo se
+    genera una respuesta invalide las copias en caché de los navegadores,
+    aunque la sesión no haya cambiado. Sólo se consultan nombres y fechas de
+    modificación, no el contenido de los archivos.
+    """
+    digest = hashlib.sha1()
+    for dirpath, dirnames, filenames in os.walk(root_path):
+        dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+        for name in sorted(filenames):
+            if name.endswith((".py", ".html", ".json")):
+                path = os.path.join(dirpath, name)
+                digest.update(f"{path}:{os.stat(path).st_mtime_ns}".encode())
+    return digest.hexdigest()[:12]
+
+
+def make_etag(version: str, kind: str) -> str:
+    """Construye el ETag (sin comillas) de la representación ``kind`` de una versión."""
+    return f"{current_app.config['ETAG_SALT']}-{version}-{kind}"
+
+
+def is_not_modified(etag: str) -> bool:
+    """
+    Indica si ``If-None-Match`` ya contiene ``etag`` o una de sus variantes comprimidas.
+
+    Todas las variantes representan el mismo contenido, así que cualquiera
+    de ellas basta para responder 304.
+    """
+    if_none_match = request.if_none_match
+    if not if_none_match:
+        return False
+    return any(
+        if_none_match.contains(tag)
+        for tag in [etag] + [f"{etag}-{s}" for s in _ENCODING_SUFFIX.values()]
+    )
+
+
+def wants_json() -> bool:
+    """Indica si el cliente pidió la respuesta en JSON (peticiones ``fetch`` de la tabla)."""
+    return request.accept_mimetypes.best == "application/json"
+
+
+def not_modified_response(etag: str) -> Response:
+    """Devuelve una respuesta 304 con las mismas cabeceras de caché que la completa."""
+    response = Response(status=304)
+    return cacheable(response, etag)
+
+
+def cacheable(response: Response, etag: str) -> Response:
+    """
+    Marca ``response`` para revalidación en cada uso.
+
+    Las respuestas dependen de la sesión del usuario, así que son privadas
+    y varían según la cookie.
+    """
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Cookie")
+    return response
+
+
+def _brotli():
+    """Devuelve el módulo ``brotli`` si está instalado, o ``None``."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def compress_response(response: Response) -> Response:
+    """
+    Comprime el cuerpo de ``response`` con brotli o gzip si el cliente lo acepta.
+
+    Sólo se comprimen respuestas 200 de tipos en :data:`COMPRESSIBLE_MIMETYPES`
+    de al menos ``COMPRESS_MIN_BYTES``. Brotli se usa si el paquete opcional
+    ``brotli`` está instalado. Si la respuesta tiene un ETag fuerte, se le añade
+    un sufijo por codificación.
+    """
+    min_size = current_app.config.get("COMPRESS_MIN_BYTES", 2048)
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    accepted = request.accept_encodings
+    brotli = _brotli()
+    encoding: Optional[str] = None
+    if brotli is not None and accepted["br"]:
+        encoding = "br"
+    elif accepted["gzip"]:
+        encoding = "gzip"
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if len(body) < min_size:
+        return response
+    if encoding == "br":
+        body = brotli.compress(body, quality=5)
+    else:
+        body = gzip.compress(body, compresslevel=6)
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{_ENCODING_SUFFIX[encoding]}")
+    return response
+
+
+__all__ = [
+    "COMPRESSIBLE_MIMETYPES",
+    "app_fingerprint",
+    "make_etag",
+    "is_not_modified",
+    "wants_json",
+    "not_modified_response",
+    "cacheable",
+    "compress_response",
+]
@@ -0,0 +1,173 @@
+import glob
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Directorio con los perfiles incluidos en la aplicación.
+BUILTIN_PROFILES_FOLDER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "layouts"
+)
+
+# Columnas de datos que el parser necesita de cada fila.
+DATA_COLUMNS = ("start_time", "end_time", "group", "block", "program")
+# Celdas de metadatos que el parser lee de cada hoja.
+METADATA_CELLS = ("date", "location", "code", "instructor")
+
+_CELL_RE = re.compile(r"^([A-Z]+)([1-9][0-9]*)$")
+_COLUMN_RE = re.compile(r"^[A-Z]+$")
+
+
+def _column_index(letters: str) -> int:
+    """Convierte una columna de Excel (``"A"``, ``"AB"``) en un índice basado en cero."""
+    index = 0
+    for char in letters:
+        index = index * 26 + (ord(char) - ord("A") + 1)
+    return index - 1
+
+
+def _cell_coordinates(ref: str) -> Tuple[int, int]:
+    """Convierte una celda de Excel (``"O2"``) en ``(fila, columna)`` basados en cero."""
+    match = _CELL_RE.match(ref.strip().upper())
+    if not match:
+        raise ValueError(f"Invalid cell reference: {ref!r}")
+    return int(match.group(2)) - 1, _column_index(match.group(1))
+
+
+@dataclass(frozen=True)
+class LayoutProfile:
+    """
+    Describe dónde están los datos de un horario dentro de una hoja.
+
+    Los perfiles se declaran en archivos JSON con referencias de Excel
+    (``"O2"`` para celdas, ``"R"`` para columnas) y se compilan al cargarse
+    en coordenadas basadas en cero, de modo que el parser sólo indexa
+    tuplas de valores sin volver a interpretar la declaración.
+
+    Attributes:
+        name: Identificador del perfil.
+        cells: Coordenadas ``(fila, columna)`` de cada celda de metadatos.
+        columns: Índices de las columnas de datos, en el orden de
+            :data:`DATA_COLUMNS`.
+        first_data_row: Índice basado en cero de la primera fila de datos.
+        required_cells: Celdas de metadatos que deben tener contenido para
+            que la hoja se considere un horario.
+        match: Patrones que deben encontrarse en ciertas celdas, para
+            distinguir formatos con dimensiones similares.
+        priority: Los perfiles con mayor prioridad se prueban primero.
+    """
+
+    name: str
+    cells: Dict[str, Tuple[int, int]]
+    columns: Tuple[int, ...]
+    first_data_row: int
+    required_cells: Tuple[str, ...] = ()
+    match: Tuple[Tuple[Tuple[int, int], "re.Pattern"], ...] = ()
+    priority: int = 0
+    description: str = ""
+    header_rows: int = field(init=False)
+    min_rows: int = field(init=False)
+
+    def __post_init__(self) -> None:
+        header_cells = list(self.cells.values()) + [coord for coord, _ in self.match]
+        object.__setattr__(
+            self, "header_rows", max(row for row, _ in header_cells) + 1
+        )
+        object.__setattr__(self, "min_rows", self.first_data_row + 1)
+
+    def extract(self, row: Sequence[object]) -> Tuple[object, ...]:
+        """Devuelve los valores de las columnas de datos de ``row``, o ``None`` si faltan."""
+        size = len(row)
+        return tuple(row[i] if i < size else None for i in self.columns)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "LayoutProfile":
+        """
+        Compila la declaración de un perfil.
+
+        Raises:
+            ValueError: Si faltan claves o alguna referencia es inválida.
+        """
+        try:
+            name = str(data["name"])
+            raw_cells = dict(data["cells"])
+            raw_columns = dict(data["columns"])
+            first_data_row = int(data["first_data_row"])
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError(f"Invalid layout profile: {exc}") from exc
+        missing = [key for key in METADATA_CELLS if key not in raw_cells]
+        missing += [key for key in DATA_COLUMNS if key not in raw_columns]
+        if missing:
+            raise ValueError(f"Layout profile {name!r} is missing {', '.join(missing)}")
+        columns = []
+        for key in DATA_COLUMNS:
+            letters = str(raw_columns[key]).strip().upper()
+            if not _COLUMN_RE.match(letters):
+                raise ValueError(f"Invalid column reference: {letters!r}")
+            columns.append(_column_index(letters))
+        required = tuple(data.get("required_cells", ()))
+        unknown = [key for key in required if key not in METADATA_CELLS]
+        if unknown:
+            raise ValueError(f"Unknown required cells: {', '.join(unknown)}")
+        return cls(
+            name=name,
+            cells={key: _cell_coordinates(raw_cells[key]) for key in METADATA_CELLS},
+            columns=tuple(columns),
+            first_data_row=first_data_row - 1,
+            required_cells=required,
+            match=tuple(
+                (_cell_coordinates(ref), re.compile(pattern, re.IGNORECASE))
+                for ref, pattern in dict(data.get("match", {})).items()
+            ),
+            priority=int(data.get("priority", 0)),
+            description=str(data.get("description", "")),
+        )
+
+
+def _read_folder(folder: str) -> List[LayoutProfile]:
+    profiles = []
+    for path in sorted(glob.glob(os.path.join(folder, "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                profiles.append(LayoutProfile.from_dict(json.load(f)))
+            except (ValueError, json.JSONDecodeError) as exc:
+                raise ValueError(f"{os.path.basename(path)}: {exc}") from exc
+    return profiles
+
+
+@lru_cache(maxsize=8)
+def load_layout_profiles(folder: Optional[str] = None) -> Tuple[LayoutProfile, ...]:
+    """
+    Carga y compila los perfiles de diseño disponibles.
+
+    Siempre se incluyen los perfiles de :data:`BUILTIN_PROFILES_FOLDER`.
+    Si se indica ``folder``, sus perfiles se añaden y, con la misma
+    prioridad, se prueban antes que los incluidos. El resultado se guarda
+    en caché por carpeta.
+
+    Args:
+        folder: Directorio opcional con perfiles ``*.json`` adicionales.
+
+    Returns:
+        Los perfiles ordenados en el orden en que deben probarse.
+
+    Raises:
+        ValueError: Si algún archivo de perfil es inválido.
+    """
+    profiles = []
+    if folder and os.path.abspath(folder) != BUILTIN_PROFILES_FOLDER:
+        profiles.extend(_read_folder(folder))
+    profiles.extend(_read_folder(BUILTIN_PROFILES_FOLDER))
+    # ``sorted`` es estable: a igual prioridad se conserva el orden anterior.
+    return tuple(sorted(profiles, key=lambda p: -p.priority))
+
+
+__all__ = [
+    "BUILTIN_PROFILES_FOLDER",
+    "DATA_COLUMNS",
+    "METADATA_CELLS",
+    "LayoutProfile",
+    "load_layout_profiles",
+]
@@ -1,5 +1,4 @@
 import re
-import pandas as pd
 from typing import Optional
 
 
@@ -136,6 +135,9 @@ def determine_shift_by_time(start_time: str) -> str:
         Nombre del turno correspondiente.
     """
 
+    # pandas se importa aquí para no cargarlo al importar el módulo.
+    import pandas as pd
+
     try:
         start_time_24h = pd.to_datetime(start_time).strftime("%H:%M")
         return "P. ZUÑIGA" if start_time_24h < "14:00" else "H. GARCIA"
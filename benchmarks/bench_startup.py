@@ -0,0 +1,101 @@
+"""
+Benchmark del tiempo de arranque de la aplicación.
+
+Cada medición se ejecuta en un intérprete nuevo para que las importaciones no
+estén en caché. Se mide:
+
+* ``import``: importar :mod:`app`.
+* ``create_app``: construir la aplicación Flask.
+* primera solicitud a cada ruta indicada, usando el cliente de pruebas.
+
+Además se indica si pandas quedó cargado tras cada paso, para detectar
+regresiones en la carga diferida.
+
+Uso::
+
+    python benchmarks/bench_startup.py [--runs N] [--route /ruta ...]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Código ejecutado en cada subproceso. Devuelve los tiempos en JSON por stdout.
+_PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+result = {
+    "import": t1 - t0,
+    "create_app": t2 - t1,
+    "pandas_after_create_app": "pandas" in sys.modules,
+    "requests": {},
+}
+client = app.test_client()
+for method, route in json.loads(sys.argv[1]):
+    t = time.perf_counter()
+    client.open(route, method=method)
+    result["requests"][f"{method} {route}"] = {
+        "seconds": time.perf_counter() - t,
+        "pandas_loaded": "pandas" in sys.modules,
+    }
+print(json.dumps(result))
+"""
+
+
+def _run_once(routes):
+    env = dict(os.environ, SECRET_KEY=os.environ.get("SECRET_KEY") or "bench")
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE, json.dumps(routes)],
+        cwd=ROOT,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--route",
+        action="append",
+        dest="routes",
+        help="Ruta a solicitar en la forma 'METHOD /path' (repetible).",
+    )
+    args = parser.parse_args()
+    routes = [
+        r.split(" ", 1) if " " in r else ["GET", r]
+        for r in (args.routes or ["GET /", "POST /destroy-session"])
+    ]
+
+    runs = [_run_once(routes) for _ in range(args.runs)]
+
+    def _report(label, values):
+        ms = [v * 1000 for v in values]
+        print(
+            f"{label:<28} median {statistics.median(ms):8.1f} ms"
+            f"   min {min(ms):8.1f} ms   max {max(ms):8.1f} ms"
+        )
+
+    print(f"runs: {args.runs}")
+    _report("import app", [r["import"] for r in runs])
+    _report("create_app()", [r["create_app"] for r in runs])
+    print(f"{'':<28} pandas loaded: {runs[-1]['pandas_after_create_app']}")
+    for key in runs[0]["requests"]:
+        _report(f"first {key}", [r["requests"][key]["seconds"] for r in runs])
+        print(f"{'':<28} pandas loaded: {runs[-1]['requests'][key]['pandas_loaded']}")
+
+
+if __name__ == "__main__":
+    main()
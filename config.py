@@ -8,7 +8,33 @@ class Config:
     UPLOAD_FOLDER = os.path.join(BASE_DIR, "storage", "uploads")
     SESSION_FOLDER = os.path.join(BASE_DIR, "storage", "sessions")
     SESSION_EXPIRE_SECONDS = int(os.getenv("SESSION_EXPIRE_SECONDS", 60 * 60))
+    # Intervalo máximo en el que se revisan todas las sesiones en busca de
+    # expiradas; la revisión se reparte entre las solicitudes de ese intervalo.
+    SESSION_SWEEP_SECONDS = int(os.getenv("SESSION_SWEEP_SECONDS", 60))
     MAX_CONTENT_LENGTH = int(os.getenv("MAX_UPLOAD_MB", 5)) * 1024 * 1024
+    # Directorio opcional con perfiles de diseño (*.json) adicionales a los
+    # incluidos en ``app/layouts``.
+    LAYOUT_PROFILES_FOLDER = os.getenv("LAYOUT_PROFILES_FOLDER", "")
+    # Procesos entre los que se reparten las hojas de un mismo libro. Cada
+    # proceso web tiene su propio pool, así que por defecto los CPU se reparten
+    # entre los ``WEB_CONCURRENCY`` procesos web; aun así, con más de un CPU se
+    # usan al menos dos, para que un libro grande no se analice en serie
+    # aunque haya más procesos web que CPU (con 1, no se crea el pool).
+    PARSER_WORKERS = int(
+        os.getenv(
+            "PARSER_WORKERS",
+            max(
+                min(2, os.cpu_count() or 1),
+                (os.cpu_count() or 1) // int(os.getenv("WEB_CONCURRENCY", 1)),
+            ),
+        )
+    )
+    # Memoria máxima (estimada) de horarios analizados en espera de escribirse
+    # en la sesión, sumando todas las subidas en curso del proceso; al
+    # alcanzarla, el análisis se detiene.
+    UPLOAD_BUFFER_MB = int(os.getenv("UPLOAD_BUFFER_MB", 32))
+    # Tamaño mínimo de una respuesta HTML/TSV para comprimirla con gzip/brotli.
+    COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 2048))
 
     for _folder in (UPLOAD_FOLDER, SESSION_FOLDER):
         os.makedirs(_folder, exist_ok=True)
@@ -0,0 +1,37 @@
+import gc
+import multiprocessing
+import os
+
+# Configuración de Gunicorn. Se carga automáticamente al ejecutar
+# ``gunicorn`` desde la raíz del proyecto.
+
+wsgi_app = "run:app"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+# Un worker web por CPU (al menos dos) en lugar de la recomendación habitual
+# de ``2 * CPU + 1``: cada worker analiza las subidas con su propio pool de
+# procesos (``PARSER_WORKERS``), así que con más workers que CPU los pools
+# sólo compiten entre sí.
+workers = int(os.getenv("WEB_CONCURRENCY", max(2, multiprocessing.cpu_count())))
+# La configuración de la aplicación reparte ``PARSER_WORKERS`` entre los
+# workers web, así que necesita saber cuántos hay. Para fijar otro reparto,
+# define ``PARSER_WORKERS`` explícitamente.
+os.environ.setdefault("WEB_CONCURRENCY", str(workers))
+
+# Con ``preload_app`` la aplicación se crea una sola vez en el proceso maestro
+# y los workers se obtienen mediante ``fork``, compartiendo la memoria de los
+# módulos ya importados.
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+
+def when_ready(server):
+    """Carga los módulos pesados en el maestro antes de crear los workers."""
+    if not server.cfg.preload_app:
+        return
+    from app import preload_heavy_modules
+
+    preload_heavy_modules()
+    # Mueve los objetos ya creados a la generación permanente para que el
+    # recolector de basura de cada worker no los toque y las páginas de
+    # memoria sigan compartidas tras el ``fork``.
+    gc.freeze()
+    server.log.info("Heavy modules preloaded in master")